@@ -0,0 +1,209 @@
+from fnmatch import fnmatch
+
+import numpy as np
+
+# Each rule fires when all of its conditions hold for `for_seconds` and clears once they have
+# stopped holding for `clear_seconds`. A condition on a wildcard channel holds if any matching
+# channel satisfies it. While a rule is firing, `clear` replaces `value` as the threshold.
+# Trend conditions ('rising', 'falling') compare the change of the smoothed telemetry since the
+# previous tick, as the raw values change direction from one tick to the next with the noise.
+# The thresholds lie in the tail of what RaceDataSimulator produces, so every rule can be raised
+# during a 24 hour race; oil_level only gets below 0.85 in its last hours.
+DEFAULT_ALERT_RULES = [
+    {
+        'name': 'brake_disc_overheat',
+        'severity': 'warning',
+        'conditions': [{'channel': 'brake_disc_temp_*', 'op': '>', 'value': 650, 'clear': 600}],
+        'for_seconds': 5,
+        'clear_seconds': 5,
+    },
+    {
+        'name': 'oil_starvation',
+        'severity': 'critical',
+        'conditions': [
+            {'channel': 'oil_level', 'op': '<', 'value': 0.85, 'clear': 0.86},
+            {'channel': 'oil_pressure', 'op': 'falling', 'value': 0.3},
+        ],
+        'for_seconds': 3,
+        'clear_seconds': 10,
+    },
+    {
+        'name': 'oil_overheat',
+        'severity': 'warning',
+        'conditions': [{'channel': 'oil_temperature', 'op': '>', 'value': 105, 'clear': 104}],
+        'for_seconds': 10,
+        'clear_seconds': 10,
+    },
+    {
+        'name': 'coolant_overheat',
+        'severity': 'warning',
+        'conditions': [{'channel': 'coolant_temperature', 'op': '>', 'value': 98, 'clear': 97}],
+        'for_seconds': 10,
+        'clear_seconds': 10,
+    },
+    {
+        'name': 'tire_pressure_low',
+        'severity': 'warning',
+        'conditions': [{'channel': 'tire_pressure_*', 'op': '<', 'value': 29.5, 'clear': 29.6}],
+        'for_seconds': 5,
+        'clear_seconds': 5,
+    },
+    {
+        'name': 'driver_stress',
+        'severity': 'warning',
+        'conditions': [{'channel': 'heart_rate', 'op': '>', 'value': 140, 'clear': 136}],
+        'for_seconds': 5,
+        'clear_seconds': 30,
+    },
+    {
+        'name': 'driver_fatigue',
+        'severity': 'critical',
+        'conditions': [{'channel': 'blink_rate', 'op': '<', 'value': 17.5, 'clear': 17.7}],
+        'for_seconds': 10,
+        'clear_seconds': 30,
+    },
+]
+
+# op -> (compares the change since the previous tick, sign, strict comparison)
+# Every comparison is evaluated as `sign * value > sign * threshold` (or >= when not strict)
+_OPERATORS = {
+    '>': (False, 1, True),
+    '>=': (False, 1, False),
+    '<': (False, -1, True),
+    '<=': (False, -1, False),
+    'rising': (True, 1, True),
+    'falling': (True, -1, True),
+}
+
+
+class AlertEngine:
+    """
+    Evaluates declarative alert rules over the telemetry of the whole field at once.
+
+    The rules are compiled once into flat arrays with one entry per (condition, channel)
+    comparison, so a tick is a fixed number of array operations over a (cars x comparisons)
+    matrix, independent of how many rules there are or how many clients read the result.
+    Debounce counters and firing state are kept in (cars x rules) arrays, and only state
+    changes are reported.
+    """
+
+    def __init__(self, rules: list, channels: list, num_cars: int, tick_seconds: float = 1):
+        """
+        Args:
+            rules: Alert rule definitions, see DEFAULT_ALERT_RULES
+            channels: Telemetry channel names, in the column order of the matrices passed to evaluate()
+            num_cars: Number of cars in the field
+            tick_seconds: Time between two evaluations, used to turn durations into tick counts
+        """
+        self.rules = rules
+        self.channels = list(channels)
+        self.num_cars = num_cars
+
+        channel_index = []
+        use_delta = []
+        sign = []
+        strict = []
+        enter_threshold = []
+        exit_threshold = []
+        condition_starts = []
+        rule_starts = []
+
+        for rule in rules:
+            # reduceat cannot reduce an empty rule, it would take the next rule's first condition instead
+            if not rule['conditions']:
+                raise ValueError(f"Alert rule '{rule['name']}' has no conditions")
+            rule_starts.append(len(condition_starts))
+            for condition in rule['conditions']:
+                if condition['op'] not in _OPERATORS:
+                    raise ValueError(f"Unknown operator '{condition['op']}' in alert rule '{rule['name']}'")
+                matches = [i for i, name in enumerate(self.channels) if fnmatch(name, condition['channel'])]
+                if not matches:
+                    raise ValueError(f"No channel matches '{condition['channel']}' in alert rule '{rule['name']}'")
+
+                delta, condition_sign, condition_strict = _OPERATORS[condition['op']]
+                value = condition.get('value', 0)
+                clear = condition.get('clear', value)
+                # A 'falling' value is the minimum drop, compared as -change > value
+                if condition['op'] == 'falling':
+                    value, clear = -value, -clear
+
+                condition_starts.append(len(channel_index))
+                for i in matches:
+                    channel_index.append(i)
+                    use_delta.append(delta)
+                    sign.append(condition_sign)
+                    strict.append(condition_strict)
+                    enter_threshold.append(value)
+                    exit_threshold.append(clear)
+
+        self._channel_index = np.array(channel_index, dtype=np.intp)
+        self._rule_of_comparison = np.repeat(
+            np.repeat(np.arange(len(rules)), np.diff(rule_starts + [len(condition_starts)])),
+            np.diff(condition_starts + [len(channel_index)]),
+        )
+        self._use_delta = np.array(use_delta, dtype=bool)
+        self._sign = np.array(sign, dtype=float)
+        self._strict = np.array(strict, dtype=bool)
+        self._enter_threshold = np.array(enter_threshold, dtype=float) * self._sign
+        self._exit_threshold = np.array(exit_threshold, dtype=float) * self._sign
+        self._condition_starts = np.array(condition_starts, dtype=np.intp)
+        self._rule_starts = np.array(rule_starts, dtype=np.intp)
+
+        self._for_ticks = np.array([max(1, round(rule.get('for_seconds', 0) / tick_seconds)) for rule in rules])
+        self._clear_ticks = np.array([max(1, round(rule.get('clear_seconds', 0) / tick_seconds)) for rule in rules])
+
+        self._previous = None
+        self.firing = np.zeros((num_cars, len(rules)), dtype=bool)
+        self._on_ticks = np.zeros((num_cars, len(rules)), dtype=np.int64)
+        self._off_ticks = np.zeros((num_cars, len(rules)), dtype=np.int64)
+
+    def reset(self) -> list:
+        """
+        Forgets the previous tick, the debounce counters and which rules are firing.
+
+        Returns:
+            A list of (car index, rule index, False) tuples, one for every rule that was firing and is cleared
+        """
+        cleared_cars, cleared_rules = np.nonzero(self.firing)
+        self._previous = None
+        self.firing = np.zeros_like(self.firing)
+        self._on_ticks = np.zeros_like(self._on_ticks)
+        self._off_ticks = np.zeros_like(self._off_ticks)
+        return [(int(car), int(rule), False) for car, rule in zip(cleared_cars, cleared_rules)]
+
+    def evaluate(self, telemetry: np.ndarray, smoothed: np.ndarray | None = None) -> list:
+        """
+        Evaluates all rules for one tick.
+
+        Args:
+            telemetry: A (cars x channels) array of the current values, columns in the order of `channels`
+            smoothed: The same values smoothed, e.g. by telemetry_filter, trend conditions compare its changes;
+                      defaults to `telemetry`
+
+        Returns:
+            A list of (car index, rule index, firing) tuples, one for every rule that was raised or cleared
+        """
+        telemetry = np.asarray(telemetry, dtype=float)
+        smoothed = telemetry if smoothed is None else np.asarray(smoothed, dtype=float)
+        if self._previous is None:
+            self._previous = smoothed
+
+        values = telemetry[:, self._channel_index]
+        changes = smoothed[:, self._channel_index] - self._previous[:, self._channel_index]
+        self._previous = smoothed
+
+        lhs = np.where(self._use_delta, changes, values) * self._sign
+        rhs = np.where(self.firing[:, self._rule_of_comparison], self._exit_threshold, self._enter_threshold)
+        comparisons = np.where(self._strict, lhs > rhs, lhs >= rhs)
+
+        # Any matching channel satisfies a condition, all conditions satisfy a rule
+        conditions = np.logical_or.reduceat(comparisons, self._condition_starts, axis=1)
+        holding = np.logical_and.reduceat(conditions, self._rule_starts, axis=1)
+
+        self._on_ticks = np.where(holding, self._on_ticks + 1, 0)
+        self._off_ticks = np.where(holding, 0, self._off_ticks + 1)
+        firing = np.where(self.firing, self._off_ticks < self._clear_ticks, self._on_ticks >= self._for_ticks)
+
+        changed_cars, changed_rules = np.nonzero(firing != self.firing)
+        self.firing = firing
+        return [(int(car), int(rule), bool(firing[car, rule])) for car, rule in zip(changed_cars, changed_rules)]
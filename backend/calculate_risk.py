@@ -1,2 +1,33 @@
-def calculate_risk():
-    return 10
\ No newline at end of file
+import math
+
+BASE_RISK = 10
+CLOSE_FOLLOWING_INTERVAL = 1.0  # seconds
+CLOSE_FOLLOWING_MAX_RISK = 20
+# The anomaly score is the probability of a less unusual row, uniform over [0, 1] for normal telemetry. Risk is
+# added on its surprise -log(1 - score): from the rarest 1% of normal rows on, at full weight from the rarest 0.001%.
+ANOMALY_THRESHOLD = 0.99
+ANOMALY_SATURATION = 0.99999
+ANOMALY_MAX_RISK = 30
+# The highest risk calculate_risk can return
+MAX_RISK = BASE_RISK + CLOSE_FOLLOWING_MAX_RISK + ANOMALY_MAX_RISK
+
+
+def anomaly_surprise(anomaly):
+    """The anomaly score as -log(1 - score), infinite for a score of 1."""
+    return -math.log1p(-anomaly) if anomaly < 1 else math.inf
+
+
+def calculate_risk(proximity=None, anomaly=None):
+    risk = BASE_RISK
+
+    # Following closely behind another car raises the risk, the closer the higher
+    if proximity is not None and proximity['ahead_interval'] < CLOSE_FOLLOWING_INTERVAL:
+        risk += CLOSE_FOLLOWING_MAX_RISK * (1 - proximity['ahead_interval'] / CLOSE_FOLLOWING_INTERVAL)
+
+    # Telemetry the risk model finds rare for a normal car raises the risk, the rarer the higher
+    if anomaly is not None and anomaly > ANOMALY_THRESHOLD:
+        threshold = anomaly_surprise(ANOMALY_THRESHOLD)
+        fraction = (anomaly_surprise(anomaly) - threshold) / (anomaly_surprise(ANOMALY_SATURATION) - threshold)
+        risk += ANOMALY_MAX_RISK * min(fraction, 1.0)
+
+    return risk
@@ -0,0 +1,172 @@
+"""
+Compact binary state of the simulators, for checkpoints and seeking within a race.
+
+The formats are plain struct layouts with a magic and a version, not pickles, so a checkpoint
+cannot execute code when loaded and stays readable as long as its version is supported.
+"""
+import os
+import random
+import struct
+
+import numpy as np
+
+import telemetry_schema
+
+CHECKPOINT_MAGIC = b'RCKP'
+CHECKPOINT_VERSION = 1
+
+_PYTHON_RANDOM = struct.Struct('<I625I?d')
+_NUMPY_PCG64 = struct.Struct('<16s16sII')
+_CHECKPOINT_HEADER = struct.Struct('<4sHQI')
+_LENGTH = struct.Struct('<I')
+
+
+def pack_python_random(rng: random.Random) -> bytes:
+    version, internal_state, gauss_next = rng.getstate()
+    return _PYTHON_RANDOM.pack(version, *internal_state, gauss_next is not None, gauss_next or 0.0)
+
+
+def unpack_python_random(rng: random.Random, buffer: bytes, offset: int) -> int:
+    """Restores the state packed by pack_python_random() into rng and returns the offset after it."""
+    version, *values = _PYTHON_RANDOM.unpack_from(buffer, offset)
+    internal_state, has_gauss_next, gauss_next = values[:625], values[625], values[626]
+    rng.setstate((version, tuple(internal_state), gauss_next if has_gauss_next else None))
+    return offset + _PYTHON_RANDOM.size
+
+
+def pack_numpy_generator(rng: np.random.Generator) -> bytes:
+    state = rng.bit_generator.state
+    if state['bit_generator'] != 'PCG64':
+        raise ValueError(f"Only PCG64 generators can be packed, not {state['bit_generator']}")
+    return _NUMPY_PCG64.pack(
+        state['state']['state'].to_bytes(16, 'little'),
+        state['state']['inc'].to_bytes(16, 'little'),
+        state['has_uint32'],
+        state['uinteger'],
+    )
+
+
+def unpack_numpy_generator(rng: np.random.Generator, buffer: bytes, offset: int) -> int:
+    """Restores the state packed by pack_numpy_generator() into rng and returns the offset after it."""
+    state, inc, has_uint32, uinteger = _NUMPY_PCG64.unpack_from(buffer, offset)
+    rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger,
+    }
+    return offset + _NUMPY_PCG64.size
+
+
+def check_header(buffer: bytes, header: struct.Struct, magic: bytes, version: int) -> tuple:
+    """Unpacks a state header and checks its magic and version."""
+    values = header.unpack_from(buffer, 0)
+    if values[0] != magic:
+        raise ValueError(f"Not a {magic.decode()} state")
+    if values[1] != version:
+        raise ValueError(f"Unsupported {magic.decode()} state version {values[1]}")
+    return values
+
+
+class RaceCheckpointer:
+    """
+    Keeps the state of the whole field every `every_ticks` ticks.
+
+    Seeking to any tick restores the closest earlier checkpoint and re-simulates at most
+    `every_ticks` ticks. The latest checkpoint is also written to disk, so a restarted server
+    can resume the race where it stopped.
+    """
+
+    def __init__(self, every_ticks: int = 600, checkpoint_file: str | None = None):
+        """
+        Args:
+            every_ticks: Ticks between two checkpoints, the most a seek has to re-simulate
+            checkpoint_file: Path the latest checkpoint is written to, None to keep checkpoints in memory only
+        """
+        self.every_ticks = every_ticks
+        self.checkpoint_file = checkpoint_file
+        self.checkpoints = {}
+
+    def maybe_checkpoint(self, tick: int, driver_simulators: list, race_simulators: list):
+        """Takes a checkpoint if `tick` is a multiple of `every_ticks`."""
+        if tick % self.every_ticks != 0:
+            return
+
+        checkpoint = pack_checkpoint(tick, driver_simulators, race_simulators)
+        self.checkpoints[tick] = checkpoint
+        self._write(checkpoint)
+
+    def _write(self, checkpoint: bytes):
+        """Atomically replaces the checkpoint file, if there is one."""
+        if self.checkpoint_file:
+            partial_file = self.checkpoint_file + ".partial"
+            with open(partial_file, 'wb') as f:
+                f.write(checkpoint)
+            os.replace(partial_file, self.checkpoint_file)
+
+    def seek(self, tick: int, driver_simulators: list, race_simulators: list):
+        """
+        Puts the simulators in the state they had after `tick` ticks.
+
+        The race continues from there on a new timeline, so the checkpoints after the restored one
+        are dropped and the checkpoint file is rolled back to it.
+
+        Raises:
+            ValueError: If there is no checkpoint at or before `tick`
+        """
+        earlier = [checkpoint_tick for checkpoint_tick in self.checkpoints if checkpoint_tick <= tick]
+        if not earlier:
+            raise ValueError(f"No checkpoint at or before tick {tick}")
+
+        checkpoint = self.checkpoints[max(earlier)]
+        checkpoint_tick = unpack_checkpoint(checkpoint, driver_simulators, race_simulators)
+        for later_tick in [later_tick for later_tick in self.checkpoints if later_tick > checkpoint_tick]:
+            del self.checkpoints[later_tick]
+        self._write(checkpoint)
+
+        records = telemetry_schema.empty_records(len(race_simulators))
+        for _ in range(tick - checkpoint_tick):
+            for car, (driver_sim, race_sim) in enumerate(zip(driver_simulators, race_simulators)):
+                driver_sim.generate_next_data_point()
+                race_sim.generate_next_record(records, car)
+
+    def resume(self, driver_simulators: list, race_simulators: list):
+        """
+        Restores the simulators from the checkpoint file, if there is one.
+
+        Returns:
+            The tick the race resumes at, or None if there was no checkpoint file
+        """
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return None
+
+        with open(self.checkpoint_file, 'rb') as f:
+            checkpoint = f.read()
+        tick = unpack_checkpoint(checkpoint, driver_simulators, race_simulators)
+        self.checkpoints[tick] = checkpoint
+        return tick
+
+
+def pack_checkpoint(tick: int, driver_simulators: list, race_simulators: list) -> bytes:
+    parts = [_CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, tick, len(driver_simulators))]
+    for driver_sim, race_sim in zip(driver_simulators, race_simulators):
+        for state in (driver_sim.export_state(), race_sim.export_state()):
+            parts.append(_LENGTH.pack(len(state)))
+            parts.append(state)
+    return b''.join(parts)
+
+
+def unpack_checkpoint(checkpoint: bytes, driver_simulators: list, race_simulators: list) -> int:
+    """Restores every simulator from a checkpoint and returns the tick it was taken at."""
+    _, _, tick, num_cars = check_header(checkpoint, _CHECKPOINT_HEADER, CHECKPOINT_MAGIC, CHECKPOINT_VERSION)
+    if num_cars != len(driver_simulators):
+        raise ValueError(f"Checkpoint has {num_cars} cars, the race has {len(driver_simulators)}")
+
+    offset = _CHECKPOINT_HEADER.size
+    for driver_sim, race_sim in zip(driver_simulators, race_simulators):
+        for simulator in (driver_sim, race_sim):
+            (length,) = _LENGTH.unpack_from(checkpoint, offset)
+            offset += _LENGTH.size
+            simulator.import_state(checkpoint[offset:offset + length])
+            offset += length
+    return tick
@@ -3,6 +3,8 @@ import numpy as np
 import datetime
 from scipy.ndimage import gaussian_filter1d
 
+from telemetry_schema import CHANNELS_BY_GROUP, SMOOTHED_CHANNELS
+
 # --- Configuration ---
 NUM_HOURS = 24 # Simulating a 24-hour race
 SAMPLE_RATE_SECONDS = 1
@@ -10,9 +12,10 @@ TOTAL_SAMPLES = NUM_HOURS * 3600 // SAMPLE_RATE_SECONDS
 OUTPUT_FILENAME = "consistent_race_data.csv"
 
 # --- Realistic Parameter Ranges & Initial Values ---
+# Which channels there are and their groups come from telemetry_schema, a channel without parameters here fails at import
 
-# Car State (initial values and typical operating ranges/changes)
-CAR_PARAMS = {
+CHANNEL_PARAMS = {
+    # Car State (initial values and typical operating ranges/changes)
     'tire_temp_FL': {'init': 90, 'std_dev': 1.5, 'stress_factor': 1.05},
     'tire_temp_FR': {'init': 90, 'std_dev': 1.5, 'stress_factor': 1.05},
     'tire_temp_RL': {'init': 90, 'std_dev': 1.5, 'stress_factor': 1.05},
@@ -33,23 +36,23 @@ CAR_PARAMS = {
     'oil_temperature': {'init': 100, 'std_dev': 0.3, 'stress_increase': 0.7},
     'oil_pressure': {'init': 60, 'std_dev': 1, 'rpm_effect': 0.005, 'level_effect': -0.05},
     'oil_level': {'init': 1.0, 'decrease_per_hour': 0.002, 'min': 0.8}, # Simulating very slow consumption
-}
 
-# Driver Health
-DRIVER_PARAMS = {
+    # Driver Health
     'heart_rate': {'init': 130, 'std_dev': 1, 'fatigue_increase': 0.2, 'stress_spike': 10},
     'gsr': {'init': 4, 'std_dev': 0.1, 'fatigue_increase': 0.05, 'stress_spike': 2},
     'pupil_dilation': {'init': 4.5, 'std_dev': 0.05, 'fatigue_increase': 0.01},
     'blink_rate': {'init': 18, 'std_dev': 0.1, 'fatigue_decrease': 0.1},
-}
 
-# Environmental Condition
-ENV_PARAMS = {
+    # Environmental Condition
     'rainfall_intensity': {'init': 0.0, 'max_rain': 10.0, 'rain_duration_hours': 2, 'start_hour': 5},
     'track_temperature': {'init': 35, 'std_dev': 0.5, 'rain_effect': -5, 'night_effect': -0.2},
     'ambient_light': {'init': 70000, 'std_dev': 1000, 'night_start_hour': 18, 'night_end_hour': 6},
 }
 
+CAR_PARAMS = {channel: CHANNEL_PARAMS[channel] for channel in CHANNELS_BY_GROUP['car']}
+DRIVER_PARAMS = {channel: CHANNEL_PARAMS[channel] for channel in CHANNELS_BY_GROUP['driver']}
+ENV_PARAMS = {channel: CHANNEL_PARAMS[channel] for channel in CHANNELS_BY_GROUP['environment']}
+
 # Smoothing factor for sensor readings (higher = smoother)
 SMOOTHING_SIGMA = 20 # Applied after initial generation to mimic sensor inertia
 
@@ -222,7 +225,7 @@ def generate_race_data():
 
     # Apply Gaussian smoothing to sensor-like data for more consistency
     for col in df.columns:
-        if col != 'timestamp' and col not in ['brake_pedal_pressure', 'rainfall_intensity']: # Don't smooth discrete events or rainfall
+        if col in SMOOTHED_CHANNELS: # Don't smooth discrete events or rainfall
             df[col] = gaussian_filter1d(df[col], sigma=SMOOTHING_SIGMA)
     
     # Ensure some columns remain within bounds after smoothing
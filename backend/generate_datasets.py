@@ -0,0 +1,125 @@
+"""
+Generates simulated (car, race) telemetry datasets in parallel.
+
+Every job gets its own SeedSequence spawned from the root seed, and every random draw of the
+job's simulators comes from it. The jobs do not depend on each other or on which process runs
+them, so the same seed produces byte-identical shards with any number of workers.
+
+Usage:
+    python generate_datasets.py --races 10 --cars 60 --hours 24 --seed 42 --workers 16 --output-dir datasets
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import race_data_simulator
+import race_simulator
+import telemetry_schema
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Race information written next to the telemetry, the names are kept in the manifest only
+DRIVER_COLUMNS = ['PiC', 'laps', 'last_lap', 'best_lap', 'gap', 'pits', 'max_speed', 'status']
+
+
+def shard_filename(race: int, car: int) -> str:
+    return f"race{race:04d}_car{car:03d}.csv"
+
+
+def generate_shard(job: dict) -> dict:
+    """
+    Simulates one car for one race and writes it to a shard file.
+
+    Args:
+        job: The race and car numbers, the run parameters and the job's SeedSequence
+
+    Returns:
+        The manifest entry of the shard
+    """
+    driver_seed, data_seed = job['seed_seq'].spawn(2)
+    driver_sim = race_simulator.DriverRaceSimulator(f"Driver {job['car'] + 1}", f"Car #{job['car'] + 1}", job['car'] + 1, random_seed=driver_seed)
+    race_sim = race_data_simulator.RaceDataSimulator(num_hours=job['hours'], random_seed=data_seed)
+
+    driver_rows = []
+    telemetry = telemetry_schema.empty_records(race_sim.total_samples)
+    for tick in range(race_sim.total_samples):
+        driver_data = driver_sim.generate_next_data_point()
+        driver_rows.append([driver_data[column] for column in DRIVER_COLUMNS])
+        race_sim.generate_next_record(telemetry, tick)
+
+    filename = shard_filename(job['race'], job['car'])
+    path = os.path.join(job['output_dir'], filename)
+    shard = pd.DataFrame(driver_rows, columns=DRIVER_COLUMNS)
+    shard.insert(0, 'time', np.arange(1, race_sim.total_samples + 1))
+    pd.concat([shard, pd.DataFrame(telemetry)], axis=1).to_csv(path, index=False)
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        'race': job['race'],
+        'car': job['car'],
+        'file': filename,
+        'rows': len(telemetry),
+        'sha256': digest,
+        'seed_spawn_key': list(job['seed_seq'].spawn_key),
+    }
+
+
+def generate_datasets(races: int, cars: int, hours: int, seed: int, output_dir: str, workers: int = 1) -> dict:
+    """
+    Generates all (race, car) shards and writes the manifest.
+
+    Returns:
+        The manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Spawned in job order, so a job's stream depends only on the root seed and its position
+    seed_seqs = np.random.SeedSequence(seed).spawn(races * cars)
+    jobs = [
+        {'race': race, 'car': car, 'hours': hours, 'output_dir': output_dir, 'seed_seq': seed_seqs[race * cars + car]}
+        for race in range(races)
+        for car in range(cars)
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(executor.map(generate_shard, jobs))
+    else:
+        shards = [generate_shard(job) for job in jobs]
+
+    manifest = {
+        'seed': seed,
+        'races': races,
+        'cars': cars,
+        'hours': hours,
+        'shards': shards,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate simulated race telemetry datasets in parallel.")
+    parser.add_argument("--races", type=int, default=1, help="Number of races to simulate")
+    parser.add_argument("--cars", type=int, default=10, help="Number of cars per race")
+    parser.add_argument("--hours", type=int, default=6, help="Duration of every race in hours")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed, the same seed gives identical output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--output-dir", default="datasets", help="Directory the shards and manifest are written to")
+    args = parser.parse_args()
+
+    manifest = generate_datasets(args.races, args.cars, args.hours, args.seed, args.output_dir, args.workers)
+    print(f"Generated {len(manifest['shards'])} shards in '{args.output_dir}'.")
+
+
+if __name__ == "__main__":
+    main()
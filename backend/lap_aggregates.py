@@ -0,0 +1,169 @@
+import numpy as np
+
+SUMMARY_FIELDS = ('min', 'max', 'mean', 'last', 'time_above')
+
+
+class SegmentAccumulator:
+    """
+    Running per-channel summaries of the current segment (lap or stint) of every car.
+
+    All cars are updated together from a (cars x channels) array, so a tick costs a handful
+    of array operations. When a car crosses a segment boundary its row is sealed into a compact
+    (channels x fields) float32 record and reset for the next segment.
+    """
+
+    def __init__(self, num_cars: int, thresholds: np.ndarray, tick_seconds: float = 1):
+        """
+        Args:
+            num_cars: Number of cars in the field
+            thresholds: Per-channel value above which time is counted towards time_above
+            tick_seconds: Time represented by one update
+        """
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.tick_seconds = tick_seconds
+        num_channels = len(self.thresholds)
+
+        self.count = np.zeros(num_cars, dtype=np.int64)
+        self.start_time = np.zeros(num_cars)
+        self.minimum = np.full((num_cars, num_channels), np.inf)
+        self.maximum = np.full((num_cars, num_channels), -np.inf)
+        self.total = np.zeros((num_cars, num_channels))
+        self.last = np.full((num_cars, num_channels), np.nan)
+        self.ticks_above = np.zeros((num_cars, num_channels), dtype=np.int64)
+        # Segments that did not see all of their ticks, e.g. because they restarted after a seek
+        self.partial = np.zeros(num_cars, dtype=bool)
+
+    def update(self, telemetry: np.ndarray, cars: np.ndarray):
+        """
+        Adds one tick of telemetry to the running summaries.
+
+        Args:
+            telemetry: A (cars x channels) array of the current values
+            cars: Boolean mask of the cars whose segment is running this tick
+        """
+        values = telemetry[cars]
+        self.count[cars] += 1
+        self.minimum[cars] = np.minimum(self.minimum[cars], values)
+        self.maximum[cars] = np.maximum(self.maximum[cars], values)
+        self.total[cars] += values
+        self.last[cars] = values
+        self.ticks_above[cars] += values > self.thresholds
+
+    def seal(self, car: int, end_time: float, partial: bool = False):
+        """
+        Closes the current segment of a car and starts a new one.
+
+        Args:
+            car: The car whose segment is closed
+            end_time: Race time of the boundary, the start time of the new segment
+            partial: Whether the new segment starts in the middle of a lap or stint
+
+        Returns:
+            A (start_time, end_time, summary, partial) tuple, summary being a (channels x SUMMARY_FIELDS) float32
+            array, or None if nothing was recorded since the last boundary
+        """
+        record = None
+        if self.count[car] > 0:
+            summary = np.stack([
+                self.minimum[car],
+                self.maximum[car],
+                self.total[car] / self.count[car],
+                self.last[car],
+                self.ticks_above[car] * self.tick_seconds,
+            ], axis=1).astype(np.float32)
+            record = (float(self.start_time[car]), float(end_time), summary, bool(self.partial[car]))
+
+        self.count[car] = 0
+        self.start_time[car] = end_time
+        self.minimum[car] = np.inf
+        self.maximum[car] = -np.inf
+        self.total[car] = 0
+        self.last[car] = np.nan
+        self.ticks_above[car] = 0
+        self.partial[car] = partial
+        return record
+
+
+class RaceAggregates:
+    """
+    Per-lap and per-stint telemetry summaries for the whole field.
+
+    Laps are sealed when a lap is completed and stints when a car enters the pits. The pit stop
+    itself counts towards the lap, but not towards any stint.
+    """
+
+    def __init__(self, channels: list, num_cars: int, thresholds: dict, tick_seconds: float = 1):
+        """
+        Args:
+            channels: Telemetry channel names, in the column order of the arrays passed to update()
+            num_cars: Number of cars in the field
+            thresholds: Value per channel above which time is counted, missing channels are never counted
+            tick_seconds: Time represented by one update
+        """
+        self.channels = list(channels)
+        threshold_values = np.array([thresholds.get(channel, np.inf) for channel in self.channels], dtype=float)
+
+        self._laps = SegmentAccumulator(num_cars, threshold_values, tick_seconds)
+        self._stints = SegmentAccumulator(num_cars, threshold_values, tick_seconds)
+        self.laps = [[] for _ in range(num_cars)]
+        self.stints = [[] for _ in range(num_cars)]
+
+    def update(self, telemetry: np.ndarray, race_time: np.ndarray, lap_completed: np.ndarray, pit_entered: np.ndarray, in_pit: np.ndarray):
+        """
+        Seals the segments whose boundary fired this tick, then adds the tick to the running segments.
+
+        Args:
+            telemetry: A (cars x channels) array of the current values
+            race_time: Race time of every car in seconds
+            lap_completed: Boolean mask of the cars that completed a lap this tick
+            pit_entered: Boolean mask of the cars that entered the pits this tick
+            in_pit: Boolean mask of the cars currently in the pits
+        """
+        for car in np.flatnonzero(lap_completed):
+            record = self._laps.seal(car, race_time[car])
+            if record is not None:
+                self.laps[car].append(record)
+
+        for car in np.flatnonzero(pit_entered):
+            record = self._stints.seal(car, race_time[car])
+            if record is not None:
+                self.stints[car].append(record)
+
+        # A stint starts when the car leaves the pits, so one that starts after a seek into a pit stop is complete
+        self._stints.start_time[in_pit] = race_time[in_pit]
+        self._stints.partial[in_pit] = False
+
+        self._laps.update(telemetry, np.ones(len(telemetry), dtype=bool))
+        self._stints.update(telemetry, ~in_pit)
+
+    def truncate(self, race_time: float):
+        """
+        Rolls the summaries back to `race_time`, after the race was seeked there.
+
+        Sealed laps and stints that ended later are dropped. The running segments hold ticks from
+        both sides of `race_time` that cannot be told apart, so they restart empty at `race_time`
+        and are marked partial when they are sealed.
+        """
+        for segments in (self.laps, self.stints):
+            for car_segments in segments:
+                while car_segments and car_segments[-1][1] > race_time:
+                    car_segments.pop()
+
+        for accumulator in (self._laps, self._stints):
+            for car in range(len(accumulator.count)):
+                accumulator.seal(car, race_time, partial=True)
+
+    def to_dict(self, number: int, record: tuple) -> dict:
+        """Converts a sealed record into a JSON serializable dict."""
+        start_time, end_time, summary, partial = record
+        return {
+            'number': number,
+            'start_time': start_time,
+            'end_time': end_time,
+            # Only summarizes the part of the segment after a seek
+            'partial': partial,
+            'channels': {
+                channel: {field: round(float(value), 4) for field, value in zip(SUMMARY_FIELDS, values)}
+                for channel, values in zip(self.channels, summary)
+            },
+        }
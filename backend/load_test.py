@@ -0,0 +1,279 @@
+"""
+Load-generation harness that simulates many dashboard clients against the backend.
+
+The app is started under uvicorn on loopback, then N concurrent clients either poll /stats at a
+fixed interval ("poll" mode) or hold /alerts/stream connections open while a single client keeps
+the race ticking ("stream" mode). Throughput, latency percentiles, error rate and the server's CPU
+and RSS are reported per second and for the whole run, and saved as JSON so runs before and after
+a change can be compared.
+
+Like soak_test.py, the server runs a fresh race that neither resumes from nor overwrites the
+RACE_CHECKPOINT_FILE checkpoint. With more than one worker, every worker would otherwise simulate
+a race of its own, so the race is run by race_owner.py and the workers serve it from shared memory
+(see main.py); /alerts/stream is not served in that mode, so stream runs use a single worker.
+
+Server CPU/RSS are read from /proc and are only available on Linux.
+
+Usage:
+    python load_test.py --clients 200 --interval 1 --duration 60 --output load_results/before.json
+    python load_test.py --compare load_results/before.json load_results/after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SUMMARY_METRICS = ['throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate', 'cpu_percent', 'max_rss_mb']
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_environment(shared_memory_name: str | None = None) -> dict:
+    """The environment of the server processes: a fresh race, shared only when a shared memory name is given."""
+    env = {key: value for key, value in os.environ.items() if key not in ("RACE_CHECKPOINT_FILE", "RACE_SHARED_MEMORY")}
+    if shared_memory_name:
+        env["RACE_SHARED_MEMORY"] = shared_memory_name
+    return env
+
+
+def start_race_owner(shared_memory_name: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "race_owner.py", "--name", shared_memory_name],
+        cwd=BACKEND_DIR,
+        env=server_environment(),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def start_server(port: int, workers: int, shared_memory_name: str | None = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=server_environment(shared_memory_name),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60):
+    """Waits until /stats answers, which in shared mode also needs the race owner to have published a tick."""
+    async with httpx.AsyncClient() as client:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/stats")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+
+def process_usage(pid: int):
+    """Returns the (cpu seconds, rss bytes) of a process and its children, or None when /proc is not available."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+
+    cpu_seconds = 0.0
+    rss = 0
+    try:
+        for p in pids:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu_seconds += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            rss += int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+    return cpu_seconds, rss
+
+
+async def poll_client(client: httpx.AsyncClient, base_url: str, interval: float, stop_at: float, samples: list):
+    # Spread the clients over the interval instead of sending every request at once
+    await asyncio.sleep(np.random.uniform(0, interval))
+    while time.monotonic() < stop_at:
+        started = time.monotonic()
+        try:
+            response = await client.get(f"{base_url}/stats")
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        finished = time.monotonic()
+        samples.append((finished, finished - started, ok))
+        await asyncio.sleep(max(0.0, interval - (finished - started)))
+
+
+async def stream_client(client: httpx.AsyncClient, base_url: str, stop_at: float, samples: list, events: list):
+    started = time.monotonic()
+    try:
+        async with client.stream("GET", f"{base_url}/alerts/stream", timeout=None) as response:
+            samples.append((time.monotonic(), time.monotonic() - started, response.status_code == 200))
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    events.append(time.monotonic())
+                if time.monotonic() >= stop_at:
+                    break
+    except httpx.HTTPError:
+        samples.append((time.monotonic(), time.monotonic() - started, False))
+
+
+async def sample_server(pids: list, stop_at: float, usage: list):
+    while time.monotonic() < stop_at:
+        current = [process_usage(pid) for pid in pids]
+        if None not in current:
+            usage.append((time.monotonic(), sum(cpu for cpu, _ in current), sum(rss for _, rss in current)))
+        await asyncio.sleep(1)
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 2) if len(latencies) else None
+
+
+def summarize(samples: list, usage: list, started: float, duration: float) -> dict:
+    """Reduces the raw samples to totals for the whole run and a per-second timeline."""
+    times = np.array([sample[0] - started for sample in samples])
+    latencies = np.array([sample[1] for sample in samples])
+    ok = np.array([sample[2] for sample in samples], dtype=bool)
+
+    timeline = []
+    for second in range(int(np.ceil(duration))):
+        in_second = (times >= second) & (times < second + 1)
+        timeline.append({
+            'second': second,
+            'requests': int(in_second.sum()),
+            'errors': int((in_second & ~ok).sum()),
+            'p50_ms': percentile_ms(latencies[in_second & ok], 50),
+            'p95_ms': percentile_ms(latencies[in_second & ok], 95),
+        })
+
+    cpu_percent = None
+    max_rss_mb = None
+    if len(usage) >= 2:
+        for previous, current in zip(usage, usage[1:]):
+            second = int(current[0] - started)
+            if second < len(timeline):
+                timeline[second]['cpu_percent'] = round((current[1] - previous[1]) / (current[0] - previous[0]) * 100, 1)
+                timeline[second]['rss_mb'] = round(current[2] / 2 ** 20, 1)
+        cpu_percent = round((usage[-1][1] - usage[0][1]) / (usage[-1][0] - usage[0][0]) * 100, 1)
+        max_rss_mb = round(max(sample[2] for sample in usage) / 2 ** 20, 1)
+
+    return {
+        'summary': {
+            'requests': len(samples),
+            'throughput': round(int(ok.sum()) / duration, 2),
+            'p50_ms': percentile_ms(latencies[ok], 50),
+            'p95_ms': percentile_ms(latencies[ok], 95),
+            'p99_ms': percentile_ms(latencies[ok], 99),
+            'error_rate': round(float((~ok).mean()), 4) if len(ok) else 0.0,
+            'cpu_percent': cpu_percent,
+            'max_rss_mb': max_rss_mb,
+        },
+        'timeline': timeline,
+    }
+
+
+async def run_load(args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # Several workers serve one race simulated by a race owner, which is measured with them
+    shared_memory_name = f"load_test_{os.getpid()}" if args.workers > 1 else None
+    owner = start_race_owner(shared_memory_name) if shared_memory_name else None
+    server = start_server(port, args.workers, shared_memory_name)
+    try:
+        await wait_until_ready(base_url)
+
+        samples = []
+        events = []
+        usage = []
+        started = time.monotonic()
+        stop_at = started + args.duration
+        limits = httpx.Limits(max_connections=args.clients + 1, max_keepalive_connections=args.clients + 1)
+
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            tasks = [asyncio.create_task(sample_server([server.pid] + ([owner.pid] if owner else []), stop_at, usage))]
+            if args.mode == "poll":
+                tasks += [asyncio.create_task(poll_client(client, base_url, args.interval, stop_at, samples)) for _ in range(args.clients)]
+            else:
+                # One client keeps the race ticking, the others only listen
+                ticker_samples = []
+                tasks.append(asyncio.create_task(poll_client(client, base_url, args.interval, stop_at, ticker_samples)))
+                tasks += [asyncio.create_task(stream_client(client, base_url, stop_at, samples, events)) for _ in range(args.clients)]
+
+            # Streams only end when an event arrives after the deadline, so they are cancelled instead
+            await asyncio.sleep(args.duration)
+            await asyncio.sleep(args.interval)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        result = summarize(samples, usage, started, args.duration)
+        if args.mode == "stream":
+            result['summary']['stream_events'] = len(events)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+        if owner is not None:
+            # The owner removes the shared memory block when terminated
+            owner.terminate()
+            owner.wait()
+
+
+def compare(before_file: str, after_file: str):
+    with open(before_file) as f:
+        before = json.load(f)
+    with open(after_file) as f:
+        after = json.load(f)
+
+    print(f"{'metric':<14}{'before':>12}{'after':>12}{'change':>10}")
+    for metric in SUMMARY_METRICS:
+        old = before['summary'].get(metric)
+        new = after['summary'].get(metric)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "-"
+        print(f"{metric:<14}{str(old):>12}{str(new):>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many dashboard clients against the backend.")
+    parser.add_argument("--mode", choices=["poll", "stream"], default="poll", help="Poll /stats or hold /alerts/stream connections")
+    parser.add_argument("--clients", type=int, default=50, help="Number of concurrent clients")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between two /stats polls of a client")
+    parser.add_argument("--duration", type=float, default=30, help="Length of the run in seconds")
+    parser.add_argument("--timeout", type=float, default=10, help="Request timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn worker processes, more than one serve a race owner through shared memory")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved results instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.mode == "stream" and args.workers > 1:
+        parser.error("stream mode needs a single worker, /alerts/stream is not served from shared memory")
+
+    result = {'config': {key: value for key, value in vars(args).items() if key not in ("output", "compare")}, **asyncio.run(run_load(args))}
+    print(json.dumps(result['summary'], indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results saved to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,28 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import race_data_simulator
 import race_simulator
-from calculate_risk import calculate_risk
+from race_events import EventDrivenDriverSimulator
+import telemetry_schema
+from proximity import ProximityIndex
+from alerts import DEFAULT_ALERT_RULES, AlertEngine
+from telemetry_ingest import TelemetryIngest
+from lap_aggregates import RaceAggregates
+from shared_state import SharedRaceState
+from telemetry_filter import risk_model_filter
+from train_risk_model import race_calibration_sample
+from checkpoint import RaceCheckpointer
+from calculate_risk import MAX_RISK, calculate_risk
+from model.anomaly_detection import MultivariateAnomalyDetection, QuantileAnomalyDetection, check_calibration
+from model.color_getter import RISK_PALETTE, build_palette_hex, palette_id, scores_to_indices
 
 drivers = [
     ("Max Verstappen", "Red Bull RB20 #1", 1),
@@ -17,7 +37,15 @@ drivers = [
     ("Lance Stroll", "Aston Martin AMR24 #18", 10)
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Telemetry is only ingested where the race is simulated
+    ingest_task = None if SHARED_RACE_STATE_NAME else asyncio.create_task(telemetry_ingest.run())
+    yield
+    if ingest_task is not None:
+        ingest_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,22 +53,323 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Risk-Palette-Id"],
 )
 
-driver_simulators = []
-race_simulators = []
-for driver_name, car_name, position in drivers:
-    driver_sim = race_simulator.DriverRaceSimulator(driver_name, car_name, position)
-    driver_simulators.append(driver_sim)
-    race_sim = race_data_simulator.RaceDataSimulator() 
-    race_simulators.append(race_sim)
+telemetry_channels = telemetry_schema.CHANNEL_NAMES
+MAX_TELEMETRY_BATCH_ROWS = 10000
+
+# With RACE_SHARED_MEMORY set, the race is simulated by race_owner.py and /stats only reads its shared state,
+# so every uvicorn worker serves the same race. Workers then neither simulate nor score, and the endpoints
+# that need the race itself are answered by the owner alone.
+SHARED_RACE_STATE_NAME = os.environ.get("RACE_SHARED_MEMORY")
+# A block the owner has not written for this long is given up, the owner died or was restarted with a new block
+SHARED_RACE_STATE_TIMEOUT_SECONDS = float(os.environ.get("RACE_OWNER_TIMEOUT", 5))
+shared_race_state = None
+# Attaching and detaching must not happen while another request of the threadpool reads
+shared_race_state_lock = threading.Lock()
+
+if not SHARED_RACE_STATE_NAME:
+    # With RACE_CONTROL=event the race control advances from event to event (see race_events.py) instead of rolling
+    # every random number every second
+    DriverSimulator = EventDrivenDriverSimulator if os.environ.get("RACE_CONTROL") == "event" else race_simulator.DriverRaceSimulator
+
+    driver_simulators = []
+    race_simulators = []
+    for driver_name, car_name, position in drivers:
+        driver_sim = DriverSimulator(driver_name, car_name, position)
+        driver_simulators.append(driver_sim)
+        race_sim = race_data_simulator.RaceDataSimulator()
+        race_simulators.append(race_sim)
+
+    # Checkpoints every 10 simulated minutes bound the cost of /seek. With RACE_CHECKPOINT_FILE set, the latest
+    # checkpoint is also written there and a restarted server resumes the race from it.
+    race_checkpointer = RaceCheckpointer(600, os.environ.get("RACE_CHECKPOINT_FILE"))
+    resumed_tick = race_checkpointer.resume(driver_simulators, race_simulators)
+    if resumed_tick is not None:
+        print(f"Resumed the race from the checkpoint at {resumed_tick}s.")
+    else:
+        race_checkpointer.maybe_checkpoint(0, driver_simulators, race_simulators)
+
+    proximity_index = ProximityIndex(len(driver_simulators), driver_simulators[0].lap_length_meters)
+
+    # The model trained by train_risk_model.py is used when present, otherwise it is fitted on the bundled training data.
+    # With RISK_SCORER=quantile every channel is scored by its percentile in the training data instead; the sorted
+    # reference values are saved with a digest of the training data, so later starts only read the CSV to hash it
+    # and rebuild the artifact when the data has changed.
+    RISK_MODEL_FILE = os.path.join(os.path.dirname(__file__), "model", "risk_model.npz")
+    QUANTILE_MODEL_FILE = os.path.join(os.path.dirname(__file__), "model", "quantile_model.npz")
+    TRAIN_DATA_FILE = os.path.join(os.path.dirname(__file__), "model", "train_data.csv")
+    if os.environ.get("RISK_SCORER") == "quantile":
+        anomaly_detection = None
+        if os.path.exists(QUANTILE_MODEL_FILE):
+            anomaly_detection = QuantileAnomalyDetection.load(QUANTILE_MODEL_FILE)
+        if anomaly_detection is None or anomaly_detection.model_version != QuantileAnomalyDetection.source_version(TRAIN_DATA_FILE):
+            anomaly_detection = QuantileAnomalyDetection(TRAIN_DATA_FILE)
+            anomaly_detection.save(QUANTILE_MODEL_FILE)
+            print(f"Saved quantile model {anomaly_detection.model_version} to '{QUANTILE_MODEL_FILE}'.")
+    elif os.path.exists(RISK_MODEL_FILE):
+        anomaly_detection = MultivariateAnomalyDetection.load(RISK_MODEL_FILE)
+        print(f"Loaded risk model {anomaly_detection.model_version} trained on {anomaly_detection.count} rows.")
+    else:
+        anomaly_detection = MultivariateAnomalyDetection(TRAIN_DATA_FILE)
+    anomaly_columns = [telemetry_schema.CHANNEL_NAMES.index(column) for column in anomaly_detection.columns]
+    # A model fitted on data with other scales than the simulator scores every car at the top of the range, and one
+    # fitted on part of the race only does so in the other hours, e.g. from daybreak on. One fitted on unsmoothed
+    # telemetry scores every car close to 0 instead. So every race hour is checked for both.
+    check_calibration(anomaly_detection, race_calibration_sample(anomaly_detection.columns, race_hours=24), segments=24)
+
+    telemetry_ingest = TelemetryIngest(telemetry_channels, telemetry_schema.CHANNEL_BOUNDS, len(race_simulators))
+
+    # The risk model sees telemetry smoothed like the training data in data_script.py
+    # (Gaussian with SMOOTHING_SIGMA = 20, discrete event channels left as they are), but causally
+    telemetry_filter = risk_model_filter(len(race_simulators))
+    # Cars whose telemetry came from the car instead of the simulator on the previous tick
+    telemetry_ingested = np.zeros(len(race_simulators), dtype=bool)
+
+    # Time above 90% of a channel's range is tracked per lap and stint
+    race_aggregates = RaceAggregates(
+        telemetry_channels,
+        len(race_simulators),
+        {channel: low + 0.9 * (high - low) for channel, (low, high) in telemetry_schema.CHANNEL_BOUNDS.items() if np.isfinite(high)},
+    )
+
+    alert_engine = AlertEngine(DEFAULT_ALERT_RULES, telemetry_channels, len(race_simulators))
+    alert_events = deque(maxlen=1000)
+    alert_event_id = 0
+
+    # Serializes advancing, seeking and reading the race, which run in FastAPI's threadpool
+    race_lock = threading.Lock()
+
+RISK_PALETTE_SIZE = 256
+# Sent with every /stats response, so clients notice when their cached /palette is stale
+RISK_PALETTE_ID = palette_id(RISK_PALETTE, RISK_PALETTE_SIZE)
+
+@app.get("/schema")
+def get_telemetry_schema():
+    return telemetry_schema.to_dict()
+
+@app.get("/palette")
+def get_risk_palette():
+    return {
+        "id": RISK_PALETTE_ID,
+        "colors": build_palette_hex(RISK_PALETTE, RISK_PALETTE_SIZE).tolist(),
+    }
 
 @app.get("/stats")
-def get_realtime_risk():
-    data = []
-    for i in range(len(driver_simulators)):
-        driver_data = driver_simulators[i].generate_next_data_point()
-        race_data = race_simulators[i].generate_next_data_point()
-        data.append({"driver_data": driver_data, "data": race_data, "risk": calculate_risk()})
-
-    return data
+def get_realtime_risk(response: Response):
+    response.headers["X-Risk-Palette-Id"] = RISK_PALETTE_ID
+    if SHARED_RACE_STATE_NAME:
+        return read_shared_race_state()
+    return advance_race()
+
+def read_shared_race_state():
+    global shared_race_state
+
+    with shared_race_state_lock:
+        # A block that is not written is attached again by name, which picks up the block of a restarted owner
+        if shared_race_state is not None and shared_race_state.age() > SHARED_RACE_STATE_TIMEOUT_SECONDS:
+            shared_race_state.close()
+            shared_race_state = None
+
+        if shared_race_state is None:
+            try:
+                shared_race_state = SharedRaceState(SHARED_RACE_STATE_NAME, len(drivers), telemetry_channels)
+            except (FileNotFoundError, ValueError):
+                raise HTTPException(status_code=503, detail="The race owner process is not running", headers={"Retry-After": "1"})
+
+        # Before the first write the block is all zeros, and a block that stays unwritten has lost its owner
+        if shared_race_state.sequence == 0:
+            raise HTTPException(status_code=503, detail="The race owner has not published the race yet", headers={"Retry-After": "1"})
+        if shared_race_state.age() > SHARED_RACE_STATE_TIMEOUT_SECONDS:
+            raise HTTPException(status_code=503, detail=f"The race owner has not published the race for {shared_race_state.age():.0f}s", headers={"Retry-After": "1"})
+
+        try:
+            return shared_race_state.read([car_name for _, car_name, _ in drivers], [driver_name for driver_name, _, _ in drivers])
+        except TimeoutError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def require_race_owner():
+    """Refuses requests that need the race itself in a worker that only reads the shared state"""
+    if SHARED_RACE_STATE_NAME:
+        raise HTTPException(status_code=409, detail="The race is simulated by race_owner.py, this worker only serves /stats, /schema and /palette")
+
+def advance_race():
+    """Simulates one tick of the whole field and returns the /stats rows"""
+    with race_lock:
+        driver_data = [driver_sim.generate_next_data_point() for driver_sim in driver_simulators]
+        proximity_index.update(
+            [driver_sim.track_distance() for driver_sim in driver_simulators],
+            [driver_sim.average_speed() for driver_sim in driver_simulators],
+            [not driver_sim.in_pit for driver_sim in driver_simulators],
+        )
+
+        # One telemetry record per car; the matrix is a view of the records, not a copy
+        telemetry_records = telemetry_schema.empty_records(len(race_simulators))
+        telemetry = telemetry_schema.as_matrix(telemetry_records)
+        for i, race_sim in enumerate(race_simulators):
+            # The simulator runs on while telemetry pushed by the car takes its place, so it stays at the race tick
+            race_sim.generate_next_record(telemetry_records, i)
+            ingested = telemetry_ingest.take_rows(i)
+            # The smoothing must not blend the simulator into the car's own telemetry or back
+            if (ingested is not None) != telemetry_ingested[i]:
+                telemetry_ingested[i] = ingested is not None
+                telemetry_filter.reset(i)
+            if ingested is not None:
+                # A car sends faster than the race ticks: every row it sent since the last tick is folded into the
+                # smoothing, and the latest one is the car's telemetry of this tick
+                telemetry_filter.update_series(i, ingested[:-1])
+                telemetry[i] = ingested[-1]
+
+        data = [
+            {"driver_data": driver_data[i], "data": race_data, "proximity": proximity_index.car_proximity(i)}
+            for i, race_data in enumerate(telemetry_schema.to_dicts(telemetry_records))
+        ]
+        # Trend alert rules and the risk model see the smoothed telemetry
+        smoothed_telemetry = telemetry_filter.update(telemetry)
+        record_alerts(data, telemetry, smoothed_telemetry)
+        race_checkpointer.maybe_checkpoint(driver_simulators[0].current_time, driver_simulators, race_simulators)
+        race_aggregates.update(
+            telemetry,
+            np.array([driver_sim.current_time for driver_sim in driver_simulators]),
+            np.array([driver_sim.lap_completed for driver_sim in driver_simulators]),
+            np.array([driver_sim.pit_entered for driver_sim in driver_simulators]),
+            np.array([driver_sim.in_pit for driver_sim in driver_simulators]),
+        )
+
+        # Multivariate anomaly score of the whole field in one batch
+        for row, anomaly in zip(data, anomaly_detection.calculate_anomaly_scores(smoothed_telemetry[:, anomaly_columns]).tolist()):
+            row["anomaly"] = round(anomaly, 4)
+            row["risk"] = calculate_risk(row["proximity"], anomaly)
+
+        # Colour indices into the /palette table, computed for the whole field at once
+        risk_colors = scores_to_indices([row["risk"] / MAX_RISK for row in data], RISK_PALETTE_SIZE)
+        for row, risk_color in zip(data, risk_colors.tolist()):
+            row["risk_color"] = risk_color
+
+        return data
+
+
+@app.post("/seek")
+def seek_race(race_seconds: int):
+    global proximity_index, telemetry_filter
+
+    require_race_owner()
+
+    with race_lock:
+        # Only the past can be restored, a seek never simulates more than one checkpoint interval
+        if race_seconds > driver_simulators[0].current_time:
+            raise HTTPException(status_code=400, detail=f"The race is at {driver_simulators[0].current_time}s, cannot seek ahead to {race_seconds}s")
+        try:
+            race_checkpointer.seek(race_seconds, driver_simulators, race_simulators)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Everything derived from the abandoned timeline is rolled back with the simulators
+        race_aggregates.truncate(race_seconds)
+        race_time = f"{race_seconds // 60:02d}:{race_seconds % 60:02d}"
+        for car, rule_index, firing in alert_engine.reset():
+            append_alert_event(car, rule_index, firing, race_time)
+        telemetry_filter = risk_model_filter(len(race_simulators))
+        proximity_index = ProximityIndex(len(driver_simulators), driver_simulators[0].lap_length_meters)
+        return {"race_seconds": race_seconds}
+
+@app.post("/telemetry", status_code=202)
+async def ingest_telemetry(request: Request):
+    require_race_owner()
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            cars, values = telemetry_ingest.parse_columnar(json.loads(body))
+        else:
+            cars, values = telemetry_ingest.parse_ndjson(body)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed telemetry batch: {e}")
+
+    if len(cars) > MAX_TELEMETRY_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {MAX_TELEMETRY_BATCH_ROWS} rows")
+
+    valid = telemetry_ingest.validate(cars, values)
+    if valid.any():
+        try:
+            telemetry_ingest.submit(cars[valid], values[valid])
+        except ValueError as e:
+            # Retrying cannot help, the batch has to be split
+            raise HTTPException(status_code=413, detail=str(e))
+        except asyncio.QueueFull as e:
+            # asyncio.Queue raises it without a message, a full car backlog with one
+            raise HTTPException(status_code=503, detail=f"{str(e) or 'The telemetry queue is full'}, retry later", headers={"Retry-After": "1"})
+
+    return {
+        "accepted": int(valid.sum()),
+        "rejected": int((~valid).sum()),
+        "rejected_rows": np.flatnonzero(~valid)[:100].tolist(),
+    }
+
+def record_alerts(data, telemetry, smoothed_telemetry):
+    """Evaluates the alert rules for this tick and stores the raised/cleared events"""
+    for car, rule_index, firing in alert_engine.evaluate(telemetry, smoothed_telemetry):
+        append_alert_event(car, rule_index, firing, data[car]["driver_data"]["race_time"])
+
+def append_alert_event(car, rule_index, firing, race_time):
+    global alert_event_id
+
+    rule = alert_engine.rules[rule_index]
+    alert_event_id += 1
+    alert_events.append({
+        "id": alert_event_id,
+        "race_time": race_time,
+        "car_name": driver_simulators[car].car_name,
+        "driver_name": driver_simulators[car].driver_name,
+        "alert": rule["name"],
+        "severity": rule["severity"],
+        "state": "RAISED" if firing else "CLEARED",
+    })
+
+def segment_summaries(segments, car, since):
+    cars = range(len(driver_simulators)) if car is None else [car]
+    if any(i < 0 or i >= len(driver_simulators) for i in cars):
+        raise HTTPException(status_code=404, detail=f"Unknown car {car}")
+
+    return [
+        {
+            "car": i,
+            "car_name": driver_simulators[i].car_name,
+            "driver_name": driver_simulators[i].driver_name,
+            "segments": [race_aggregates.to_dict(number, record) for number, record in enumerate(segments[i], start=1) if number > since],
+        }
+        for i in cars
+    ]
+
+@app.get("/laps")
+def get_laps(car: int | None = None, since: int = 0):
+    require_race_owner()
+    with race_lock:
+        return segment_summaries(race_aggregates.laps, car, since)
+
+@app.get("/stints")
+def get_stints(car: int | None = None, since: int = 0):
+    require_race_owner()
+    with race_lock:
+        return segment_summaries(race_aggregates.stints, car, since)
+
+@app.get("/alerts")
+def get_alerts(since: int = 0):
+    require_race_owner()
+    with race_lock:
+        return [event for event in alert_events if event["id"] > since]
+
+@app.get("/alerts/stream")
+async def stream_alerts(since: int = 0):
+    require_race_owner()
+
+    async def events():
+        last_id = since
+        while True:
+            # A copy, as the race may append while this runs in the event loop
+            for event in [event for event in list(alert_events) if event["id"] > last_id]:
+                last_id = event["id"]
+                yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
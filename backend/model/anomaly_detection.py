@@ -1,6 +1,9 @@
+import hashlib
 from typing import Any, Optional
 import pandas as pd
 import numpy as np
+from scipy.linalg import solve_triangular
+from scipy.stats import chi2
 
 class AnomalyDetection:
     """
@@ -112,4 +115,370 @@ class AnomalyDetection:
         if not isinstance(new_value, int):
             raise TypeError('Threshold must be an integer. Instead got {}.'.format(type(new_value)))
 
-        self._threshold = new_value
\ No newline at end of file
+        self._threshold = new_value
+
+class QuantileAnomalyDetection:
+    """
+    A class for detecting anomalies using the empirical distribution of every column.
+
+    Unlike AnomalyDetection, which maps z-scores and so assumes normally distributed columns, this scores a value
+    by its percentile among the training values of its column. Clipped columns (oil_pressure) and skewed ones
+    (gsr, heart_rate) are scored by their actual distribution. Every column is sorted once, and scoring a batch
+    is one np.searchsorted per column.
+
+    Attributes:
+        _train_data_file (str): The path to the training data CSV file.
+        columns (list): The names of the columns the detector is fitted on.
+        count (int): The number of rows the detector has been fitted on.
+        quantiles (np.ndarray): A (knots x columns) array of sorted reference values of every column.
+        levels (np.ndarray): The fraction of the training values at or below every knot.
+        model_version (str): A digest of the training data file, the columns and the number of quantiles, see
+                             source_version().
+    """
+
+    ARTIFACT_FORMAT_VERSION = 1
+
+    def __init__(self, train_data_file: str, columns: Optional[list] = None, num_quantiles: Optional[int] = None):
+        """
+        Initializes the QuantileAnomalyDetection class and fits it on the training data file.
+
+        :param train_data_file: The path to the training data CSV file.
+        :param columns: The columns to use, defaults to all columns of the training data.
+        :param num_quantiles: The number of quantiles to keep per column, defaults to all training values, which
+                              gives exact percentiles. A sketch of e.g. 1001 quantiles is exact to 0.1%.
+        """
+        self._train_data_file = train_data_file
+        df = pd.read_csv(train_data_file)
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self.model_version = self.source_version(train_data_file, self.columns, num_quantiles)
+        self.__fit(df[self.columns].to_numpy(dtype=float), num_quantiles)
+
+    @staticmethod
+    def source_version(train_data_file: str, columns: Optional[list] = None, num_quantiles: Optional[int] = None) -> str:
+        """
+        Identifies what a detector is fitted from, without fitting it.
+
+        Saved artifacts carry this as their model_version, so an artifact that no longer matches its training data
+        can be told apart and rebuilt.
+
+        :param train_data_file: The path to the training data CSV file.
+        :param columns: The columns to use, defaults to all columns of the training data.
+        :param num_quantiles: The number of quantiles to keep per column, None for all training values.
+        :return: A digest of the file contents, the columns and the number of quantiles.
+        """
+        if columns is None:
+            columns = list(pd.read_csv(train_data_file, nrows=0).columns)
+        version = hashlib.sha256(','.join(columns).encode())
+        version.update(str(num_quantiles).encode())
+        with open(train_data_file, 'rb') as f:
+            version.update(f.read())
+        return version.hexdigest()[:12]
+
+    def __fit(self, rows: np.ndarray, num_quantiles: Optional[int]):
+        """
+        Sorts every column and keeps either all of its values or evenly spaced quantiles of it.
+
+        :param rows: A (rows x columns) array of training data.
+        :param num_quantiles: The number of quantiles to keep per column, None to keep all values.
+        """
+        self.count = len(rows)
+        ordered = np.sort(rows, axis=0)
+        if num_quantiles is None or num_quantiles >= self.count:
+            self.quantiles = ordered
+            self.levels = np.arange(1, self.count + 1) / self.count
+        else:
+            self.levels = np.linspace(0, 1, num_quantiles)
+            self.quantiles = np.quantile(ordered, self.levels, axis=0, method='inverted_cdf')
+
+    @classmethod
+    def load(cls, artifact_file: str):
+        """
+        Loads a detector saved with save().
+
+        :param artifact_file: The path to the model artifact.
+        :return: A fitted QuantileAnomalyDetection.
+        :raises ValueError: If the artifact was written in an unsupported format.
+        """
+        with np.load(artifact_file, allow_pickle=False) as artifact:
+            if int(artifact['format_version']) != cls.ARTIFACT_FORMAT_VERSION:
+                raise ValueError('Unsupported model artifact format {} in \'{}\'.'.format(int(artifact['format_version']), artifact_file))
+
+            detector = cls.__new__(cls)
+            detector._train_data_file = None
+            detector.columns = artifact['columns'].tolist()
+            detector.count = int(artifact['count'])
+            detector.quantiles = artifact['quantiles']
+            detector.levels = artifact['levels']
+            detector.model_version = str(artifact['model_version'])
+            return detector
+
+    def save(self, artifact_file: str):
+        """
+        Saves the sorted reference values as a model artifact that load() can read without the training data.
+
+        :param artifact_file: The path to write the model artifact to.
+        """
+        np.savez(
+            artifact_file,
+            format_version=self.ARTIFACT_FORMAT_VERSION,
+            model_version=self.model_version,
+            columns=np.array(self.columns),
+            count=self.count,
+            quantiles=self.quantiles,
+            levels=self.levels,
+        )
+
+    def calculate_percentiles(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Calculates the fraction of the training values of its column at or below every value.
+
+        :param rows: A (rows x columns) array, e.g. one row per car, in the order of the columns attribute.
+        :return: A (rows x columns) array of percentiles between 0 and 1.
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        # A leading 0 is the level of values below the smallest knot
+        levels = np.concatenate(([0.0], self.levels))
+        percentiles = np.empty_like(rows)
+        for column in range(len(self.columns)):
+            percentiles[:, column] = levels[np.searchsorted(self.quantiles[:, column], rows[:, column], side='right')]
+        return percentiles
+
+    def calculate_anomaly_scores(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Calculates the anomaly score of every row.
+
+        A value is scored by how far into either tail of its column it lies: 0 at the median and 1 beyond the
+        smallest or largest training value. The most anomalous column of a row is raised to the power of the
+        number of columns, which is its CDF for independent columns, so typical rows are not all scored high
+        just because one of many columns is a bit off.
+
+        :param rows: A (rows x columns) array, e.g. one row per car, in the order of the columns attribute.
+        :return: An array of anomaly scores between 0 and 1.
+        """
+        tails = np.abs(2 * self.calculate_percentiles(rows) - 1)
+        return tails.max(axis=1) ** len(self.columns)
+
+    @property
+    def train_data_file(self) -> str:
+        """
+        Gets the path to the training data file.
+
+        :return: The path to the training data file.
+        """
+        return self._train_data_file
+
+class MultivariateAnomalyDetection:
+    """
+    A class for detecting anomalies across several columns at once using the Mahalanobis distance.
+
+    Unlike AnomalyDetection, which scores every column on its own, this takes the correlation between the
+    columns into account, so a combination of values that is unusual together (e.g. high engine_rpm with low
+    oil_pressure) is detected even when each value is unremarkable by itself.
+
+    Attributes:
+        _train_data_file (str): The path to the training data CSV file.
+        columns (list): The names of the columns the detector is fitted on.
+        count (int): The number of rows the detector has been fitted on.
+        mean (np.ndarray): The mean vector of the columns.
+        scatter_cholesky (np.ndarray): The lower Cholesky factor of the scatter matrix (covariance * (count - 1)).
+        model_version (str): An identifier of the data the detector was trained on, empty if fitted from a CSV file.
+    """
+
+    ARTIFACT_FORMAT_VERSION = 1
+
+    def __init__(self, train_data_file: str, columns: Optional[list] = None, min_variance: float = 1e-6):
+        """
+        Initializes the MultivariateAnomalyDetection class and fits it on the training data file.
+
+        :param train_data_file: The path to the training data CSV file.
+        :param columns: The columns to use, defaults to all columns of the training data.
+        :param min_variance: The smallest variance a column is given, so constant columns do not make the
+                             covariance singular.
+        """
+        self._train_data_file = train_data_file
+        df = pd.read_csv(train_data_file)
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self.model_version = ''
+        self.__fit(df[self.columns].to_numpy(dtype=float), min_variance)
+
+    def __fit(self, rows: np.ndarray, min_variance: float):
+        """
+        Computes the mean vector and the Cholesky factor of the scatter matrix from scratch.
+
+        :param rows: A (rows x columns) array of training data.
+        :param min_variance: The smallest variance a column is given.
+        """
+        self.count = len(rows)
+        self.mean = rows.mean(axis=0)
+        centered = rows - self.mean
+        scatter = centered.T @ centered
+        diagonal = np.diag_indices_from(scatter)
+        scatter[diagonal] = np.maximum(scatter[diagonal], min_variance * (self.count - 1))
+        self.scatter_cholesky = np.linalg.cholesky(scatter)
+
+    @classmethod
+    def from_statistics(cls, columns: list, count: int, mean: np.ndarray, scatter: np.ndarray, model_version: str = '',
+                        min_variance: float = 1e-6):
+        """
+        Creates a detector from precomputed sufficient statistics, e.g. accumulated over data that does not fit in memory.
+
+        :param columns: The names of the columns the statistics belong to.
+        :param count: The number of rows the statistics were computed from.
+        :param mean: The mean vector of the columns.
+        :param scatter: The scatter matrix (sum of outer products of the centered rows).
+        :param model_version: An identifier of the data and settings the statistics come from.
+        :param min_variance: The smallest variance a column is given, so constant columns do not make the
+                             covariance singular.
+        :return: A fitted MultivariateAnomalyDetection.
+        """
+        scatter = np.array(scatter, dtype=float)
+        diagonal = np.diag_indices_from(scatter)
+        scatter[diagonal] = np.maximum(scatter[diagonal], min_variance * (count - 1))
+
+        detector = cls.__new__(cls)
+        detector._train_data_file = None
+        detector.columns = list(columns)
+        detector.count = int(count)
+        detector.mean = np.asarray(mean, dtype=float)
+        detector.scatter_cholesky = np.linalg.cholesky(scatter)
+        detector.model_version = model_version
+        return detector
+
+    @classmethod
+    def load(cls, artifact_file: str):
+        """
+        Loads a detector saved with save().
+
+        :param artifact_file: The path to the model artifact.
+        :return: A fitted MultivariateAnomalyDetection.
+        :raises ValueError: If the artifact was written in an unsupported format.
+        """
+        with np.load(artifact_file, allow_pickle=False) as artifact:
+            if int(artifact['format_version']) != cls.ARTIFACT_FORMAT_VERSION:
+                raise ValueError('Unsupported model artifact format {} in \'{}\'.'.format(int(artifact['format_version']), artifact_file))
+
+            detector = cls.__new__(cls)
+            detector._train_data_file = None
+            detector.columns = artifact['columns'].tolist()
+            detector.count = int(artifact['count'])
+            detector.mean = artifact['mean']
+            detector.scatter_cholesky = artifact['scatter_cholesky']
+            detector.model_version = str(artifact['model_version'])
+            return detector
+
+    def save(self, artifact_file: str):
+        """
+        Saves the fitted statistics as a model artifact that load() can read without the training data.
+
+        :param artifact_file: The path to write the model artifact to.
+        """
+        np.savez(
+            artifact_file,
+            format_version=self.ARTIFACT_FORMAT_VERSION,
+            model_version=self.model_version,
+            columns=np.array(self.columns),
+            count=self.count,
+            mean=self.mean,
+            scatter_cholesky=self.scatter_cholesky,
+        )
+
+    def update(self, rows: np.ndarray):
+        """
+        Adds new rows to the fitted statistics without recomputing them from the training data.
+
+        Every row changes the scatter matrix by a rank-one term, so its Cholesky factor is updated in
+        O(columns^2) per row instead of being factored again.
+
+        :param rows: A single row or a (rows x columns) array in the order of the columns attribute.
+        """
+        for row in np.atleast_2d(np.asarray(rows, dtype=float)):
+            delta = row - self.mean
+            self.count += 1
+            self.mean = self.mean + delta / self.count
+            self.__cholesky_rank_one_update(delta * np.sqrt((self.count - 1) / self.count))
+
+    def __cholesky_rank_one_update(self, vector: np.ndarray):
+        """
+        Updates the scatter Cholesky factor L in place so that L @ L.T becomes L @ L.T + vector @ vector.T.
+
+        :param vector: The rank-one update vector.
+        """
+        factor = self.scatter_cholesky
+        vector = vector.copy()
+        for k in range(len(vector)):
+            radius = np.hypot(factor[k, k], vector[k])
+            cos = radius / factor[k, k]
+            sin = vector[k] / factor[k, k]
+            factor[k, k] = radius
+            factor[k + 1:, k] = (factor[k + 1:, k] + sin * vector[k + 1:]) / cos
+            vector[k + 1:] = cos * vector[k + 1:] - sin * factor[k + 1:, k]
+
+    def calculate_mahalanobis_distances(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Calculates the squared Mahalanobis distance of every row to the fitted distribution.
+
+        All rows are solved against the Cholesky factor in a single triangular solve.
+
+        :param rows: A (rows x columns) array, e.g. one row per car, in the order of the columns attribute.
+        :return: An array with the squared distance of every row.
+        """
+        centered = np.atleast_2d(np.asarray(rows, dtype=float)) - self.mean
+        covariance_cholesky = self.scatter_cholesky / np.sqrt(self.count - 1)
+        solved = solve_triangular(covariance_cholesky, centered.T, lower=True, check_finite=False)
+        return np.einsum('ij,ij->j', solved, solved)
+
+    def calculate_anomaly_scores(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Calculates the anomaly score of every row.
+
+        For normally distributed data the squared Mahalanobis distance follows a chi-squared distribution with
+        one degree of freedom per column, so its CDF is used to normalize the distance.
+
+        :param rows: A (rows x columns) array, e.g. one row per car, in the order of the columns attribute.
+        :return: An array of anomaly scores between 0 and 1.
+        """
+        return chi2.cdf(self.calculate_mahalanobis_distances(rows), df=len(self.columns))
+
+    @property
+    def train_data_file(self) -> str:
+        """
+        Gets the path to the training data file.
+
+        :return: The path to the training data file.
+        """
+        return self._train_data_file
+
+
+def check_calibration(detector, rows: np.ndarray, top_score: float = 0.99, max_fraction: float = 0.5, min_median: float = 0.05,
+                      segments: int = 1):
+    """
+    Checks that a detector fits the telemetry it is going to score.
+
+    Scores of data from the training distribution are spread over [0, 1], so only a small share of them lies
+    above top_score and about half of them above 0.5. A detector fitted on data with other scales scores nearly
+    every row at the top instead, and one fitted on data with a wider spread, e.g. unsmoothed telemetry, scores
+    nearly every row close to 0; either way the score is constant and useless. Telemetry that changes over the
+    race, e.g. with the light, is checked in segments, so a detector that only fits part of the race is noticed
+    as well.
+
+    :param detector: A fitted MultivariateAnomalyDetection or QuantileAnomalyDetection.
+    :param rows: A (rows x columns) array of typical telemetry, in the order of the columns attribute.
+    :param top_score: The score from which on a row counts as scored at the top of the range.
+    :param max_fraction: The largest share of rows of a segment that may be scored at the top.
+    :param min_median: The lowest median score a segment may have.
+    :param segments: The number of equally long, consecutive segments the rows are checked in, e.g. one per race hour.
+    :raises ValueError: If more than max_fraction of the rows of a segment score at or above top_score, or if the
+                        median score of a segment is below min_median.
+    """
+    scores = detector.calculate_anomaly_scores(rows)
+    for segment, segment_scores in enumerate(np.array_split(scores, segments)):
+        fraction = float(np.mean(segment_scores >= top_score))
+        if fraction > max_fraction:
+            raise ValueError('The anomaly model does not fit the telemetry: {:.0%} of typical rows of segment {} of {} score at or above {}. '
+                             'Retrain it on data shaped like the simulator, e.g. with train_risk_model.py --simulate-reference.'
+                             .format(fraction, segment + 1, segments, top_score))
+        median = float(np.median(segment_scores))
+        if median < min_median:
+            raise ValueError('The anomaly model does not fit the telemetry: the median score of typical rows of segment {} of {} is {:.3f}, '
+                             'below {}. Retrain it on telemetry smoothed like the live telemetry, e.g. with train_risk_model.py.'
+                             .format(segment + 1, segments, median, min_median))
@@ -1,3 +1,9 @@
+from functools import lru_cache
+import hashlib
+
+import numpy as np
+
+
 def hex_to_rgb(hex_color: str) -> tuple:
     """
     Converts a hex color string to an RGB tuple.
@@ -37,3 +43,80 @@ def interpolate_color(color1: str, color2: str, value: float) -> str:
     )
 
     return rgb_to_hex(interpolated_rgb)
+
+
+RISK_PALETTE = ('#2ecc71', '#f1c40f', '#e74c3c')
+
+
+@lru_cache(maxsize=32)
+def build_palette_lut(colors: tuple, size: int = 256) -> np.ndarray:
+    """
+    Compiles a multi-stop gradient into a lookup table of RGB values.
+
+    The stops are spread evenly between 0 and 1 and each entry is interpolated the same
+    way as interpolate_color does, so a table lookup gives the same colour as the
+    per-call function. Tables are cached per palette definition.
+
+    :param colors: A tuple of at least two hex colors (e.g., ('#00ff00', '#ff0000')).
+    :param size: The number of entries in the table (e.g., 256 or 1024).
+    :return: A read-only (size, 3) uint8 array with the RGB value of every entry.
+    """
+    if len(colors) < 2:
+        raise ValueError('A palette needs at least two colors.')
+
+    stops = np.array([hex_to_rgb(color) for color in colors], dtype=float)
+    positions = np.linspace(0, 1, size) * (len(colors) - 1)
+    segment = np.minimum(positions.astype(int), len(colors) - 2)
+    value = (positions - segment)[:, None]
+
+    lut = (stops[segment] + (stops[segment + 1] - stops[segment]) * value).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+@lru_cache(maxsize=32)
+def build_palette_hex(colors: tuple, size: int = 256) -> np.ndarray:
+    """
+    Returns the lookup table of a palette as hex color strings.
+
+    :param colors: A tuple of at least two hex colors.
+    :param size: The number of entries in the table.
+    :return: A read-only (size,) array of hex color strings.
+    """
+    table = np.array([rgb_to_hex(rgb) for rgb in build_palette_lut(colors, size)])
+    table.flags.writeable = False
+    return table
+
+
+def palette_id(colors: tuple, size: int = 256) -> str:
+    """
+    Returns a short identifier of a palette definition, so clients can cache the table.
+
+    :param colors: A tuple of at least two hex colors.
+    :param size: The number of entries in the table.
+    :return: A hex digest identifying the palette.
+    """
+    return hashlib.sha1('{}:{}'.format(size, ','.join(colors)).encode()).hexdigest()[:12]
+
+
+def scores_to_indices(scores, size: int = 256) -> np.ndarray:
+    """
+    Maps scores between 0 and 1 to palette table indices in one operation.
+
+    :param scores: A float or an array of floats between 0 and 1, values outside are clipped.
+    :param size: The number of entries in the table.
+    :return: An array of integer indices into a table of the given size.
+    """
+    return (np.clip(np.asarray(scores, dtype=float), 0, 1) * (size - 1)).round().astype(np.intp)
+
+
+def scores_to_hex(scores, colors: tuple = RISK_PALETTE, size: int = 256) -> np.ndarray:
+    """
+    Maps scores between 0 and 1 to hex colors of a palette in one operation.
+
+    :param scores: A float or an array of floats between 0 and 1, values outside are clipped.
+    :param colors: A tuple of at least two hex colors.
+    :param size: The number of entries in the table.
+    :return: An array of hex color strings with the same shape as scores.
+    """
+    return build_palette_hex(colors, size)[scores_to_indices(scores, size)]
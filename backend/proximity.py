@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class ProximityIndex:
+    """
+    Keeps the field sorted by position on track and reports, for every car, the
+    nearest car ahead and behind together with the distance and time interval to it.
+
+    The sort order is kept between updates. Cars only move a little per tick, so the
+    previous order is usually still valid and checking it costs O(n); when cars have
+    swapped places (overtakes, crossing the start/finish line) the order is re-sorted
+    in O(n log n).
+    """
+
+    def __init__(self, num_cars: int, lap_length: float):
+        """
+        Args:
+            num_cars: Number of cars in the field
+            lap_length: Length of one lap in meters, used to wrap positions at the start/finish line
+        """
+        self.num_cars = num_cars
+        self.lap_length = lap_length
+
+        self._order = np.arange(num_cars)
+        self.ahead_car = np.full(num_cars, -1)
+        self.behind_car = np.full(num_cars, -1)
+        self.ahead_distance = np.full(num_cars, np.nan)
+        self.behind_distance = np.full(num_cars, np.nan)
+        self.ahead_interval = np.full(num_cars, np.nan)
+        self.behind_interval = np.full(num_cars, np.nan)
+
+    def update(self, distances, speeds, on_track=None):
+        """
+        Re-orders the field and recomputes the nearest-ahead/behind values.
+
+        Args:
+            distances: Total distance covered by each car in meters
+            speeds: Current speed of each car in meters per second
+            on_track: Optional boolean mask, cars marked False (e.g. in the pits) are left out
+        """
+        positions = np.mod(np.asarray(distances, dtype=float), self.lap_length)
+        speeds = np.asarray(speeds, dtype=float)
+        if on_track is None:
+            on_track = np.ones(self.num_cars, dtype=bool)
+        else:
+            on_track = np.asarray(on_track, dtype=bool)
+
+        # Only sort again if the previous order is no longer ascending
+        ordered_positions = positions[self._order]
+        if np.any(ordered_positions[1:] < ordered_positions[:-1]):
+            self._order = self._order[np.argsort(ordered_positions, kind='stable')]
+
+        self.ahead_car.fill(-1)
+        self.behind_car.fill(-1)
+        for values in (self.ahead_distance, self.behind_distance, self.ahead_interval, self.behind_interval):
+            values.fill(np.nan)
+
+        field = self._order[on_track[self._order]]
+        if len(field) < 2:
+            return self
+
+        # The car at the end of the order is followed by the first one, one lap further on
+        ahead = np.roll(field, -1)
+        gap = np.mod(positions[ahead] - positions[field], self.lap_length)
+
+        self.ahead_car[field] = ahead
+        self.behind_car[ahead] = field
+        self.ahead_distance[field] = gap
+        self.behind_distance[ahead] = gap
+        with np.errstate(divide='ignore'):
+            self.ahead_interval[field] = gap / speeds[field]
+        self.behind_interval[ahead] = self.ahead_interval[field]
+
+        return self
+
+    def car_proximity(self, index: int):
+        """
+        Returns the proximity data of a single car, or None if it was not on track.
+
+        Args:
+            index: Index of the car, in the order used for update()
+        """
+        if self.ahead_car[index] < 0:
+            return None
+
+        return {
+            'ahead_car': int(self.ahead_car[index]),
+            'ahead_distance': round(float(self.ahead_distance[index]), 1),
+            'ahead_interval': round(float(self.ahead_interval[index]), 3),
+            'behind_car': int(self.behind_car[index]),
+            'behind_distance': round(float(self.behind_distance[index]), 1),
+            'behind_interval': round(float(self.behind_interval[index]), 3),
+        }
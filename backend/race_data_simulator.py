@@ -1,18 +1,31 @@
 import pandas as pd
 import numpy as np
 import datetime
-import random
+import struct
 import sys
 
+import checkpoint
+import seeding
+import telemetry_schema
+
+STATE_MAGIC = b'RDSS'
+STATE_VERSION = 1
+_STATE_HEADER = struct.Struct('<4sHQddH')
+
 # --- Helper Function (stateless, so can be outside the class or a static method) ---
-def _apply_change(current_value, base_value, noise_range, trend_value=0, event_effect=0):
+def _apply_change(rng, current_value, base_value, noise_range, trend_value=0, event_effect=0):
     """Applies a small random walk, a trend, and an event effect to a value, gravitating towards base."""
     new_value = current_value * 0.9 + base_value * 0.1 # Gravitate towards base
-    new_value += np.random.uniform(-noise_range, noise_range)
+    new_value += rng.uniform(-noise_range, noise_range)
     new_value += trend_value
     new_value += event_effect
     return new_value
 
+def _clip(value, channel):
+    """Clips a value to the telemetry_schema bounds of its channel."""
+    low, high = telemetry_schema.CHANNEL_BOUNDS[channel]
+    return min(max(value, low), high)
+
 class RaceDataSimulator:
     def __init__(self, num_hours=6, sample_rate_seconds=1, random_seed=None):
         """
@@ -21,8 +34,9 @@ class RaceDataSimulator:
         Args:
             num_hours (int): The total duration of the simulated data in hours.
             sample_rate_seconds (int): How frequently data points are sampled (in seconds).
-            random_seed (int, optional): A seed for the random number generators
+            random_seed (int or np.random.SeedSequence, optional): A seed for the random number generators
                                          to ensure reproducibility for this specific instance.
+                                         Every random draw of the instance comes from generators seeded by it.
         """
         # --- Instance Configuration ---
         self.num_hours = num_hours
@@ -30,21 +44,18 @@ class RaceDataSimulator:
         self.total_samples = self.num_hours * 3600 // self.sample_rate_seconds
         
         # Initialize random state for this instance
-        # Using numpy.random.default_rng for modern NumPy random state management
-        if random_seed is not None:
-            self._rng_np = np.random.default_rng(random_seed)
-            self._rng_random = random.Random(random_seed)
-        else:
-            self._rng_np = np.random.default_rng()
-            self._rng_random = random.Random()
+        # Both generators get independent streams spawned from the same SeedSequence
+        np_seed_seq, random_seed_seq = seeding.seed_sequence(random_seed).spawn(2)
+        self._rng_np = np.random.default_rng(np_seed_seq)
+        self._rng_random = seeding.python_random(random_seed_seq)
 
         # --- Instance-specific State Variables (formerly global) ---
         self._current_sample_index = 0
         self._current_oil_level = 100.0
         self._current_tire_wear = 0.0
-        self._last_car_data = {}
-        self._last_driver_data = {}
-        self._last_env_data = {}
+        # The last generated row, the next one continues from it
+        self._last_records = telemetry_schema.empty_records(1)
+        self._last = self._last_records[0]
         self._start_time = None # Will be set during initialization
 
         # --- Realistic Parameter Ranges & Initial Values (now instance attributes) ---
@@ -55,7 +66,7 @@ class RaceDataSimulator:
         self.TIRE_PRESSURE_NOISE_PER_STEP = 0.1
         self.TIRE_WEAR_RATE_PER_SECOND = 0.000005
 
-        self.BRAKE_DISC_TEMP_BASE = 400
+        self.BRAKE_DISC_TEMP_BASE = telemetry_schema.BRAKE_DISC_TEMP_BASE
         self.BRAKE_DISC_TEMP_NOISE_PER_STEP = 20
         self.BRAKE_DISC_TEMP_SPIKE_INCREMENT = 200
         self.BRAKE_DISC_TEMP_DECAY_RATE = 0.95
@@ -127,7 +138,6 @@ class RaceDataSimulator:
         self.BRAKING_EVENT_PROB = 0.005
         self.ACCELERATION_EVENT_PROB = 0.002
 
-        print(f"RaceDataSimulator instance created (Duration: {self.num_hours}h, Sample Rate: {self.sample_rate_seconds}s).")
         # Call initialization method to set up initial state
         self.initialize_simulation()
 
@@ -138,113 +148,150 @@ class RaceDataSimulator:
         self._current_tire_wear = 0.0
         self._start_time = datetime.datetime.now()
 
-        # Set initial "last" data points to base values
-        self._last_car_data = {
-            'tire_temp_FL': self.TIRE_TEMP_BASE, 'tire_temp_FR': self.TIRE_TEMP_BASE, 'tire_temp_RL': self.TIRE_TEMP_BASE, 'tire_temp_RR': self.TIRE_TEMP_BASE,
-            'tire_pressure_FL': self.TIRE_PRESSURE_BASE, 'tire_pressure_FR': self.TIRE_PRESSURE_BASE, 'tire_pressure_RL': self.TIRE_PRESSURE_BASE, 'tire_pressure_RR': self.TIRE_PRESSURE_BASE,
-            'tire_wear_rate': 0.0,
-            'brake_disc_temp_FL': self.BRAKE_DISC_TEMP_BASE, 'brake_disc_temp_FR': self.BRAKE_DISC_TEMP_BASE, 'brake_disc_temp_RL': self.BRAKE_DISC_TEMP_BASE, 'brake_disc_temp_RR': self.BRAKE_DISC_TEMP_BASE,
-            'brake_pedal_pressure': 0.0,
-            'engine_rpm': self.ENGINE_RPM_BASE,
-            'coolant_temperature': self.COOLANT_TEMP_BASE,
-            'coolant_pressure': self.COOLANT_PRESSURE_BASE,
-            'oil_temperature': self.OIL_TEMP_BASE,
-            'oil_pressure': self.OIL_PRESSURE_BASE,
-            'oil_level': 1.0 # Current oil level will be used here to kick off
-        }
-
-        self._last_driver_data = {
-            'heart_rate': self.HEART_RATE_BASE,
-            'gsr': self.GSR_BASE,
-            'pupil_dilation': self.PUPIL_DILATION_BASE,
-            'blink_rate': self.BLINK_RATE_BASE
-        }
-
-        self._last_env_data = {
-            'rainfall_intensity': 0.0,
-            'track_temperature': self.TRACK_TEMP_BASE,
-            'ambient_light': self.AMBIENT_LIGHT_BASE
-        }
-        print("Simulation state initialized for this instance.")
-
-
-    def _generate_car_data(self, current_time_in_seconds, track_temperature_val):
-        """Generates a single row of realistic car data for this instance."""
-        data = {}
+        # Set the initial "last" data point to base values
+        last = self._last
+        for side in ['FL', 'FR', 'RL', 'RR']:
+            last[f'tire_temp_{side}'] = self.TIRE_TEMP_BASE
+            last[f'tire_pressure_{side}'] = self.TIRE_PRESSURE_BASE
+            last[f'brake_disc_temp_{side}'] = self.BRAKE_DISC_TEMP_BASE
+        last['tire_wear_rate'] = 0.0
+        last['brake_pedal_pressure'] = 0.0
+        last['engine_rpm'] = self.ENGINE_RPM_BASE
+        last['coolant_temperature'] = self.COOLANT_TEMP_BASE
+        last['coolant_pressure'] = self.COOLANT_PRESSURE_BASE
+        last['oil_temperature'] = self.OIL_TEMP_BASE
+        last['oil_pressure'] = self.OIL_PRESSURE_BASE
+        last['oil_level'] = 1.0 # Current oil level will be used here to kick off
+
+        last['heart_rate'] = self.HEART_RATE_BASE
+        last['gsr'] = self.GSR_BASE
+        last['pupil_dilation'] = self.PUPIL_DILATION_BASE
+        last['blink_rate'] = self.BLINK_RATE_BASE
+
+        last['rainfall_intensity'] = 0.0
+        last['track_temperature'] = self.TRACK_TEMP_BASE
+        last['ambient_light'] = self.AMBIENT_LIGHT_BASE
+
+
+    def start_at(self, race_seconds):
+        """
+        Moves the simulation to race_seconds without simulating the ticks in between, e.g. to sample a late hour of
+        the race cheaply. The slow drifts (oil level, tire wear) are set to their expected values, every other
+        channel settles around its value for that time within a few hundred ticks.
+        """
+        samples = race_seconds // self.sample_rate_seconds
+        self._current_sample_index = samples
+        self._current_oil_level = self._last['oil_level'] = _clip(1.0 - self.OIL_LEVEL_DECREASE_PER_SECOND * samples, 'oil_level')
+        self._current_tire_wear = self._last['tire_wear_rate'] = _clip(self.TIRE_WEAR_RATE_PER_SECOND * samples, 'tire_wear_rate')
+
+    def export_state(self):
+        """
+        Exports the simulation state (sample index, last values and random generator states) as compact binary.
+        Parameters are not part of the state, import it into an instance created with the same configuration.
+        """
+        values = telemetry_schema.as_matrix(self._last_records)[0].astype('<f8')
+        return b''.join([
+            _STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, self._current_sample_index, self._current_oil_level, self._current_tire_wear, len(values)),
+            values.tobytes(),
+            checkpoint.pack_numpy_generator(self._rng_np),
+            checkpoint.pack_python_random(self._rng_random),
+        ])
+
+    def import_state(self, state):
+        """Restores a state written by export_state(), the next data point continues from it."""
+        _, _, sample_index, oil_level, tire_wear, num_values = checkpoint.check_header(state, _STATE_HEADER, STATE_MAGIC, STATE_VERSION)
+        if num_values != len(telemetry_schema.CHANNEL_NAMES):
+            raise ValueError(f"State has {num_values} channels, the simulator has {len(telemetry_schema.CHANNEL_NAMES)}")
+
+        offset = _STATE_HEADER.size
+        self._last_records[0] = tuple(np.frombuffer(state, dtype='<f8', count=num_values, offset=offset).tolist())
+        offset += num_values * 8
+        offset = checkpoint.unpack_numpy_generator(self._rng_np, state, offset)
+        checkpoint.unpack_python_random(self._rng_random, state, offset)
+
+        self._current_sample_index = sample_index
+        self._current_oil_level = oil_level
+        self._current_tire_wear = tire_wear
+
+    def _generate_car_data(self, row, current_time_in_seconds, track_temperature_val):
+        """Generates the car channels of a row of realistic data for this instance."""
+        last = self._last
 
         # Engine RPM (random walk around base, occasional shifts)
-        data['engine_rpm'] = _apply_change(self._last_car_data['engine_rpm'], self.ENGINE_RPM_BASE, self.ENGINE_RPM_NOISE_PER_STEP)
+        engine_rpm = _apply_change(self._rng_np, last['engine_rpm'], self.ENGINE_RPM_BASE, self.ENGINE_RPM_NOISE_PER_STEP)
         if self._rng_random.random() < self.ACCELERATION_EVENT_PROB:
-            data['engine_rpm'] = min(9500, data['engine_rpm'] + 1000)
-        data['engine_rpm'] = np.clip(data['engine_rpm'], 5000, 9000)
+            engine_rpm = min(9500, engine_rpm + 1000)
+        engine_rpm = _clip(engine_rpm, 'engine_rpm')
+        row['engine_rpm'] = engine_rpm
 
         # Brake Pedal Pressure & Brake Disc Temp
         brake_event = False
         if self._rng_random.random() < self.BRAKING_EVENT_PROB:
             brake_event = True
-            data['brake_pedal_pressure'] = self._rng_np.uniform(50, 100)
+            row['brake_pedal_pressure'] = self._rng_np.uniform(50, 100)
         else:
-            data['brake_pedal_pressure'] = self._last_car_data['brake_pedal_pressure'] * self.BRAKE_PEDAL_PRESSURE_DECAY_RATE + self._rng_np.uniform(-self.BRAKE_PEDAL_PRESSURE_NOISE_PER_STEP, self.BRAKE_PEDAL_PRESSURE_NOISE_PER_STEP)
-            data['brake_pedal_pressure'] = max(0, data['brake_pedal_pressure'])
+            brake_pedal_pressure = last['brake_pedal_pressure'] * self.BRAKE_PEDAL_PRESSURE_DECAY_RATE + self._rng_np.uniform(-self.BRAKE_PEDAL_PRESSURE_NOISE_PER_STEP, self.BRAKE_PEDAL_PRESSURE_NOISE_PER_STEP)
+            row['brake_pedal_pressure'] = max(0, brake_pedal_pressure)
 
+        brake_disc_temps = {}
+        # Relative to the base temperature, so a changed base keeps its range
+        brake_disc_low, brake_disc_high = (self.BRAKE_DISC_TEMP_BASE * factor for factor in telemetry_schema.BRAKE_DISC_TEMP_RANGE)
         for side in ['FL', 'FR', 'RL', 'RR']:
             temp_key = f'brake_disc_temp_{side}'
-            new_val = self._last_car_data[temp_key] * self.BRAKE_DISC_TEMP_DECAY_RATE + self.BRAKE_DISC_TEMP_BASE * (1 - self.BRAKE_DISC_TEMP_DECAY_RATE)
+            new_val = last[temp_key] * self.BRAKE_DISC_TEMP_DECAY_RATE + self.BRAKE_DISC_TEMP_BASE * (1 - self.BRAKE_DISC_TEMP_DECAY_RATE)
             new_val += self._rng_np.uniform(-self.BRAKE_DISC_TEMP_NOISE_PER_STEP, self.BRAKE_DISC_TEMP_NOISE_PER_STEP)
             if brake_event:
                 new_val += self.BRAKE_DISC_TEMP_SPIKE_INCREMENT * self._rng_np.uniform(0.8, 1.2)
-            data[temp_key] = np.clip(new_val, self.BRAKE_DISC_TEMP_BASE * 0.7, self.BRAKE_DISC_TEMP_BASE * 1.8)
+            brake_disc_temps[side] = row[temp_key] = min(max(new_val, brake_disc_low), brake_disc_high)
 
         # Tire Temps and Pressures
         for side in ['FL', 'FR', 'RL', 'RR']:
             temp_key = f'tire_temp_{side}'
             pressure_key = f'tire_pressure_{side}'
             
-            engine_stress_factor = (data['engine_rpm'] - self.ENGINE_RPM_BASE) / (9000 - self.ENGINE_RPM_BASE) if (9000 - self.ENGINE_RPM_BASE) > 0 else 0
-            brake_stress_factor = (data[f'brake_disc_temp_{side}'] - self.BRAKE_DISC_TEMP_BASE) / (self.BRAKE_DISC_TEMP_SPIKE_INCREMENT * 1.2) if (self.BRAKE_DISC_TEMP_SPIKE_INCREMENT * 1.2) > 0 else 0
+            engine_stress_factor = (engine_rpm - self.ENGINE_RPM_BASE) / (9000 - self.ENGINE_RPM_BASE) if (9000 - self.ENGINE_RPM_BASE) > 0 else 0
+            brake_stress_factor = (brake_disc_temps[side] - self.BRAKE_DISC_TEMP_BASE) / (self.BRAKE_DISC_TEMP_SPIKE_INCREMENT * 1.2) if (self.BRAKE_DISC_TEMP_SPIKE_INCREMENT * 1.2) > 0 else 0
             
             temp_trend = engine_stress_factor * 0.5 + brake_stress_factor * 0.5 + (track_temperature_val - self.TRACK_TEMP_BASE) * 0.1
-            data[temp_key] = _apply_change(self._last_car_data[temp_key], self.TIRE_TEMP_BASE, self.TIRE_TEMP_NOISE_PER_STEP, trend_value=temp_trend)
-            data[temp_key] = np.clip(data[temp_key], 70, 115)
+            tire_temp = _apply_change(self._rng_np, last[temp_key], self.TIRE_TEMP_BASE, self.TIRE_TEMP_NOISE_PER_STEP, trend_value=temp_trend)
+            tire_temp = row[temp_key] = _clip(tire_temp, temp_key)
 
-            pressure_temp_effect = (data[temp_key] - self.TIRE_TEMP_BASE) * 0.01
-            data[pressure_key] = _apply_change(self._last_car_data[pressure_key], self.TIRE_PRESSURE_BASE, self.TIRE_PRESSURE_NOISE_PER_STEP, trend_value=pressure_temp_effect)
-            data[pressure_key] = np.clip(data[pressure_key], 28, 32)
+            pressure_temp_effect = (tire_temp - self.TIRE_TEMP_BASE) * 0.01
+            tire_pressure = _apply_change(self._rng_np, last[pressure_key], self.TIRE_PRESSURE_BASE, self.TIRE_PRESSURE_NOISE_PER_STEP, trend_value=pressure_temp_effect)
+            row[pressure_key] = _clip(tire_pressure, pressure_key)
             
         # Tire Wear Rate (gradually increases)
-        data['tire_wear_rate'] = self._current_tire_wear + self.TIRE_WEAR_RATE_PER_SECOND + self._rng_np.uniform(-self.TIRE_WEAR_RATE_PER_SECOND/5, self.TIRE_WEAR_RATE_PER_SECOND/5)
-        data['tire_wear_rate'] = np.clip(data['tire_wear_rate'], 0.0, 1.0)
+        tire_wear_rate = self._current_tire_wear + self.TIRE_WEAR_RATE_PER_SECOND + self._rng_np.uniform(-self.TIRE_WEAR_RATE_PER_SECOND/5, self.TIRE_WEAR_RATE_PER_SECOND/5)
+        self._current_tire_wear = row['tire_wear_rate'] = _clip(tire_wear_rate, 'tire_wear_rate')
 
         # Coolant Temperature
-        stress_effect_ct = (data['engine_rpm'] - self.ENGINE_RPM_BASE) / 1000 * self.COOLANT_TEMP_STRESS_INCREASE
-        data['coolant_temperature'] = _apply_change(self._last_car_data['coolant_temperature'], self.COOLANT_TEMP_BASE, self.COOLANT_TEMP_NOISE_PER_STEP, trend_value=stress_effect_ct)
-        data['coolant_temperature'] = np.clip(data['coolant_temperature'], 85, 105)
+        stress_effect_ct = (engine_rpm - self.ENGINE_RPM_BASE) / 1000 * self.COOLANT_TEMP_STRESS_INCREASE
+        coolant_temperature = _apply_change(self._rng_np, last['coolant_temperature'], self.COOLANT_TEMP_BASE, self.COOLANT_TEMP_NOISE_PER_STEP, trend_value=stress_effect_ct)
+        coolant_temperature = row['coolant_temperature'] = _clip(coolant_temperature, 'coolant_temperature')
 
         # Coolant Pressure
-        pressure_effect_cp = (data['coolant_temperature'] - self.COOLANT_TEMP_BASE) * self.COOLANT_PRESSURE_TEMP_EFFECT
-        data['coolant_pressure'] = _apply_change(self._last_car_data['coolant_pressure'], self.COOLANT_PRESSURE_BASE, self.COOLANT_PRESSURE_NOISE_PER_STEP, trend_value=pressure_effect_cp)
-        data['coolant_pressure'] = np.clip(data['coolant_pressure'], 1.0, 1.6)
+        pressure_effect_cp = (coolant_temperature - self.COOLANT_TEMP_BASE) * self.COOLANT_PRESSURE_TEMP_EFFECT
+        coolant_pressure = _apply_change(self._rng_np, last['coolant_pressure'], self.COOLANT_PRESSURE_BASE, self.COOLANT_PRESSURE_NOISE_PER_STEP, trend_value=pressure_effect_cp)
+        row['coolant_pressure'] = _clip(coolant_pressure, 'coolant_pressure')
 
         # Oil Temperature
-        stress_effect_ot = (data['engine_rpm'] - self.ENGINE_RPM_BASE) / 1000 * self.OIL_TEMP_STRESS_INCREASE
-        data['oil_temperature'] = _apply_change(self._last_car_data['oil_temperature'], self.OIL_TEMP_BASE, self.OIL_TEMP_NOISE_PER_STEP, trend_value=stress_effect_ot)
-        data['oil_temperature'] = np.clip(data['oil_temperature'], 90, 115)
+        stress_effect_ot = (engine_rpm - self.ENGINE_RPM_BASE) / 1000 * self.OIL_TEMP_STRESS_INCREASE
+        oil_temperature = _apply_change(self._rng_np, last['oil_temperature'], self.OIL_TEMP_BASE, self.OIL_TEMP_NOISE_PER_STEP, trend_value=stress_effect_ot)
+        row['oil_temperature'] = _clip(oil_temperature, 'oil_temperature')
 
         # Oil Pressure
-        rpm_effect_op = (data['engine_rpm'] - self.ENGINE_RPM_BASE) * self.OIL_PRESSURE_RPM_EFFECT
+        rpm_effect_op = (engine_rpm - self.ENGINE_RPM_BASE) * self.OIL_PRESSURE_RPM_EFFECT
         level_effect_op = (1.0 - self._current_oil_level) * self.OIL_PRESSURE_LEVEL_EFFECT * 100
-        data['oil_pressure'] = _apply_change(self._last_car_data['oil_pressure'], self.OIL_PRESSURE_BASE, self.OIL_PRESSURE_NOISE_PER_STEP, trend_value=rpm_effect_op + level_effect_op)
-        data['oil_pressure'] = np.clip(data['oil_pressure'], 40, 75)
+        oil_pressure = _apply_change(self._rng_np, last['oil_pressure'], self.OIL_PRESSURE_BASE, self.OIL_PRESSURE_NOISE_PER_STEP, trend_value=rpm_effect_op + level_effect_op)
+        row['oil_pressure'] = _clip(oil_pressure, 'oil_pressure')
 
         # Oil Level (gradually decreases)
-        data['oil_level'] = self._current_oil_level - self.OIL_LEVEL_DECREASE_PER_SECOND + self._rng_np.uniform(-self.OIL_LEVEL_DECREASE_PER_SECOND/5, self.OIL_LEVEL_DECREASE_PER_SECOND/5)
-        data['oil_level'] = np.clip(data['oil_level'], 0.7, 1.0)
-
-        return data
+        oil_level = self._current_oil_level - self.OIL_LEVEL_DECREASE_PER_SECOND + self._rng_np.uniform(-self.OIL_LEVEL_DECREASE_PER_SECOND/5, self.OIL_LEVEL_DECREASE_PER_SECOND/5)
+        self._current_oil_level = row['oil_level'] = _clip(oil_level, 'oil_level')
 
-    def _generate_driver_data(self, current_time_in_seconds, ambient_light_val, brake_event_happened, acceleration_event_happened):
-        """Generates a single row of realistic driver data for this instance."""
-        data = {}
+    def _generate_driver_data(self, row, current_time_in_seconds, ambient_light_val, brake_event_happened, acceleration_event_happened):
+        """Generates the driver channels of a row of realistic data for this instance."""
+        last = self._last
         
         # Calculate fatigue factor based on total samples for this instance
         fatigue_factor = min(1.0, current_time_in_seconds / (self.total_samples * self.sample_rate_seconds) * 1.5)
@@ -253,35 +300,32 @@ class RaceDataSimulator:
         stress_effect_hr = 0
         if brake_event_happened or acceleration_event_happened: # Simulate driver stress on events
             stress_effect_hr = self.HEART_RATE_STRESS_SPIKE * self._rng_np.uniform(0.5, 1.0)
-        data['heart_rate'] = _apply_change(self._last_driver_data['heart_rate'], self.HEART_RATE_BASE, self.HEART_RATE_NOISE_PER_STEP, trend_value=fatigue_factor * (self.HEART_RATE_FATIGUE_INCREASE_PER_HOUR / 3600) + stress_effect_hr)
-        data['heart_rate'] = np.clip(data['heart_rate'], 100, 170)
+        heart_rate = _apply_change(self._rng_np, last['heart_rate'], self.HEART_RATE_BASE, self.HEART_RATE_NOISE_PER_STEP, trend_value=fatigue_factor * (self.HEART_RATE_FATIGUE_INCREASE_PER_HOUR / 3600) + stress_effect_hr)
+        row['heart_rate'] = _clip(heart_rate, 'heart_rate')
 
         # GSR (Galvanic Skin Response - stress indicator)
         stress_effect_gsr = 0
         if brake_event_happened or acceleration_event_happened:
             stress_effect_gsr = self.GSR_STRESS_SPIKE * self._rng_np.uniform(0.5, 1.0)
-        data['gsr'] = _apply_change(self._last_driver_data['gsr'], self.GSR_BASE, self.GSR_NOISE_PER_STEP, trend_value=fatigue_factor * (self.GSR_FATIGUE_INCREASE_PER_HOUR / 3600) + stress_effect_gsr)
-        data['gsr'] = np.clip(data['gsr'], 0, 12)
+        gsr = _apply_change(self._rng_np, last['gsr'], self.GSR_BASE, self.GSR_NOISE_PER_STEP, trend_value=fatigue_factor * (self.GSR_FATIGUE_INCREASE_PER_HOUR / 3600) + stress_effect_gsr)
+        row['gsr'] = _clip(gsr, 'gsr')
 
         # Pupil Dilation (can increase slightly with fatigue, affected by light)
         fatigue_increase_pd_per_second = self.PUPIL_DILATION_FATIGUE_INCREASE_PER_HOUR / 3600
         light_effect_pd_val = (ambient_light_val - self.AMBIENT_LIGHT_BASE) * self.PUPIL_DILATION_LIGHT_EFFECT_FACTOR
-        data['pupil_dilation'] = _apply_change(self._last_driver_data['pupil_dilation'], self.PUPIL_DILATION_BASE, self.PUPIL_DILATION_NOISE_PER_STEP, trend_value=fatigue_increase_pd_per_second + light_effect_pd_val)
-        data['pupil_dilation'] = np.clip(data['pupil_dilation'], 3.0, 6.0)
+        pupil_dilation = _apply_change(self._rng_np, last['pupil_dilation'], self.PUPIL_DILATION_BASE, self.PUPIL_DILATION_NOISE_PER_STEP, trend_value=fatigue_increase_pd_per_second + light_effect_pd_val)
+        row['pupil_dilation'] = _clip(pupil_dilation, 'pupil_dilation')
 
         # Blink Rate (decreases with fatigue)
         fatigue_decrease_br_per_second = self.BLINK_RATE_FATIGUE_DECREASE_PER_HOUR / 3600
-        data['blink_rate'] = _apply_change(self._last_driver_data['blink_rate'], self.BLINK_RATE_BASE, self.BLINK_RATE_NOISE_PER_STEP, trend_value=-fatigue_decrease_br_per_second)
-        data['blink_rate'] = np.clip(data['blink_rate'], 5, 20)
+        blink_rate = _apply_change(self._rng_np, last['blink_rate'], self.BLINK_RATE_BASE, self.BLINK_RATE_NOISE_PER_STEP, trend_value=-fatigue_decrease_br_per_second)
+        row['blink_rate'] = _clip(blink_rate, 'blink_rate')
 
-        return data
-
-    def _generate_environmental_data(self, current_time_in_seconds):
-        """Generates a single row of realistic environmental data for this instance."""
-        data = {}
+    def _generate_environmental_data(self, row, current_time_in_seconds):
+        """Generates the environmental channels of a row of realistic data for this instance."""
+        last = self._last
         
         current_time_in_hours = current_time_in_seconds / 3600.0
-
         # Ambient Light (Day/Night Cycle)
         current_hour_in_day = current_time_in_hours % 24
         ambient_light_val = self.AMBIENT_LIGHT_BASE
@@ -309,20 +353,18 @@ class RaceDataSimulator:
             else:
                 rainfall_intensity_val = self._rng_np.uniform(self.RAINFALL_MAX_INTENSITY * 0.7, self.RAINFALL_MAX_INTENSITY)
         else:
-            rainfall_intensity_val = max(0.0, self._last_env_data['rainfall_intensity'] * 0.99 - self._rng_np.uniform(0, self.RAINFALL_INTENSITY_NOISE_PER_STEP))
+            rainfall_intensity_val = max(0.0, last['rainfall_intensity'] * 0.99 - self._rng_np.uniform(0, self.RAINFALL_INTENSITY_NOISE_PER_STEP))
         rainfall_intensity_val = max(0.0, rainfall_intensity_val + self._rng_np.uniform(-self.RAINFALL_INTENSITY_NOISE_PER_STEP, self.RAINFALL_INTENSITY_NOISE_PER_STEP))
 
         # Track Temperature
         track_temp_trend = (ambient_light_val / self.AMBIENT_LIGHT_BASE - 0.5) * 10
         if rainfall_intensity_val > 0.5:
             track_temp_trend += self.TRACK_TEMP_RAIN_EFFECT
-        data['track_temperature'] = _apply_change(self._last_env_data['track_temperature'], self.TRACK_TEMP_BASE, self.TRACK_TEMP_NOISE_PER_STEP, trend_value=track_temp_trend/3600)
-        data['track_temperature'] = np.clip(data['track_temperature'], 10, 50)
-        
-        data['rainfall_intensity'] = rainfall_intensity_val
-        data['ambient_light'] = ambient_light_val
+        track_temperature = _apply_change(self._rng_np, last['track_temperature'], self.TRACK_TEMP_BASE, self.TRACK_TEMP_NOISE_PER_STEP, trend_value=track_temp_trend/3600)
+        row['track_temperature'] = _clip(track_temperature, 'track_temperature')
 
-        return data
+        row['rainfall_intensity'] = rainfall_intensity_val
+        row['ambient_light'] = ambient_light_val
 
     def generate_next_data_point(self):
         """
@@ -330,13 +372,27 @@ class RaceDataSimulator:
         Increments the internal sample index and updates the instance's state for the next call.
         Returns a dictionary of the new data point.
         """
+        records = telemetry_schema.empty_records(1)
+        self.generate_next_record(records, 0)
+        return telemetry_schema.to_dicts(records)[0]
+
+    def generate_next_record(self, records, index):
+        """
+        Generates the next data point into row `index` of a telemetry_schema record array.
+
+        Args:
+            records (np.ndarray): A record array of telemetry_schema.TELEMETRY_DTYPE, e.g. one row per car of the field.
+            index (int): The row to write.
+        """
+        row = records[index]
+
         # Increment the sample index for this instance
         self._current_sample_index += 1
         
         current_time_in_seconds = self._current_sample_index * self.sample_rate_seconds
 
         # Generate environmental data first, as car data might depend on it
-        env_data = self._generate_environmental_data(current_time_in_seconds)
+        self._generate_environmental_data(row, current_time_in_seconds)
         
         # Determine if a brake/acceleration event happened this step
         # These are used for driver stress calculation and are randomly determined here
@@ -344,31 +400,19 @@ class RaceDataSimulator:
         acceleration_event_happened = self._rng_random.random() < self.ACCELERATION_EVENT_PROB
 
         # Generate car data
-        car_data = self._generate_car_data(current_time_in_seconds, env_data['track_temperature'])
+        self._generate_car_data(row, current_time_in_seconds, row['track_temperature'])
         
         # Generate driver data, passing event flags and ambient light
-        driver_data = self._generate_driver_data(
+        self._generate_driver_data(
+            row,
             current_time_in_seconds,
-            env_data['ambient_light'],
+            row['ambient_light'],
             brake_event_happened,
             acceleration_event_happened
         )
 
-        # Update instance state for next iteration
-        self._current_oil_level = car_data['oil_level']
-        self._current_tire_wear = car_data['tire_wear_rate']
-        self._last_car_data = car_data
-        self._last_driver_data = driver_data
-        self._last_env_data = env_data
-
-        # Combine all data into one row dictionary
-        current_data_row = {
-            **car_data,
-            **driver_data,
-            **env_data
-        }
-
-        return current_data_row
+        # The new row is the state for the next iteration
+        self._last_records[0] = row
 
     def generate_full_dataset(self):
         """
@@ -378,16 +422,14 @@ class RaceDataSimulator:
         """
         print(f"Generating {self.total_samples} data points over {self.num_hours} hours at {self.sample_rate_seconds}-second intervals for this instance...")
 
-        data_rows = []
+        records = telemetry_schema.empty_records(self.total_samples)
         # Re-initialize state to ensure a fresh start for full dataset generation
         self.initialize_simulation()
 
-        for _ in range(self.total_samples):
-            # Call generate_next_data_point without parameters
-            data_point = self.generate_next_data_point()
-            data_rows.append(data_point)
+        for i in range(self.total_samples):
+            self.generate_next_record(records, i)
 
-        df = pd.DataFrame(data_rows)
+        df = pd.DataFrame(records)
         return df
 
 # --- Example Usage (How you would create and use multiple instances) ---
@@ -0,0 +1,289 @@
+"""
+Event-driven race control for DriverRaceSimulator.
+
+The per-second simulator rolls its random numbers every tick although laps end about every
+90 s and pit stops come every 20-40 minutes. Here lap completions, pit entry and exit and
+position changes are scheduled on a heap at their precomputed times instead, so advancing a
+car or the whole field by any interval costs work proportional to the events in it, not the
+seconds elapsed.
+
+The event times follow the same rules as the per-second simulator: a lap ends at the first
+second its base lap time is reached (or at pit exit when it was reached in the pit), a pit
+stop starts at `pit_stop_due` and takes 20-30 s, and a position change is tried with a 5%
+chance every second on track, so the time to the next try is drawn from the geometric
+distribution. The gap to the leader and the max speed change every second in the per-second
+simulator; here their summed change up to the next event is drawn at once from a normal
+distribution with the same mean and variance, and values between events are interpolated.
+The gap is only kept from going negative at events, not every second, so on average it stays
+a little smaller than in the per-second simulator.
+"""
+import heapq
+import math
+import struct
+
+import checkpoint
+from race_simulator import DriverRaceSimulator
+
+# Events of the same second run in the order the per-second simulator handles them
+PIT_EVENT = 0
+LAP_EVENT = 1
+POSITION_EVENT = 2
+
+STATE_MAGIC = b'EDSS'
+STATE_VERSION = 1
+_STATE_HEADER = struct.Struct('<4sHI')
+_STATE_FIELDS = struct.Struct('<qqddqdd')
+_EVENT = struct.Struct('<qi')
+
+POSITION_CHANGE_PROBABILITY = 0.05
+SPEED_CHANGE_PROBABILITY = 0.1
+
+
+class EventDrivenDriverSimulator(DriverRaceSimulator):
+    """
+    A DriverRaceSimulator whose race control advances from event to event.
+
+    Advancing is deterministic for a given seed regardless of the step size: advancing by an
+    hour at once leaves the car in the same state as 3600 one-second steps.
+    """
+
+    def __init__(self, driver_name: str = "Driver 1", car_name: str = "Car 1", starting_position: int = 10, random_seed=None):
+        """
+        Args:
+            driver_name: Name of the driver
+            car_name: Name/number of the car
+            starting_position: Starting grid position
+            random_seed: Optional int or np.random.SeedSequence seeding every random draw of this simulator
+        """
+        super().__init__(driver_name, car_name, starting_position, random_seed)
+        self.pit_exit_time = 0
+        self._events = []
+        self._schedule(math.ceil(self.base_lap_time), LAP_EVENT)
+        self._schedule(self.pit_stop_due, PIT_EVENT)
+        self._schedule(self._next_position_change(0), POSITION_EVENT)
+
+        # Gap and max speed are sampled at every event and interpolated in between
+        self._anchor_time = 0
+        self._anchor_gap = self.gap
+        self._anchor_max_speed = self.max_speed
+        self._sample_anchor()
+
+    @property
+    def next_event_time(self) -> int:
+        return self._events[0][0]
+
+    def _schedule(self, time: int, kind: int):
+        heapq.heappush(self._events, (time, kind))
+
+    def _next_position_change(self, after: int) -> int:
+        """Second of the next position change try after `after`, drawn from the geometric distribution."""
+        u = self._rng_random.random()
+        return after + int(math.log1p(-u) / math.log1p(-POSITION_CHANGE_PROBABILITY)) + 1
+
+    def _sample_anchor(self):
+        """Draws the gap and max speed at the next event, starting from their values at the current event."""
+        self._next_anchor_time = self.next_event_time
+        seconds = self._next_anchor_time - self._anchor_time
+
+        if self.pic == 1:
+            self._next_anchor_gap = 0.0
+        else:
+            # Every second adds U(-0.5, 0.5), +-U(0.2, 0.8) while gaining or losing positions and 1.0 in the pit
+            drift = -0.5 * self.position_trend + (1.0 if self.in_pit else 0.0)
+            variance = 1 / 12 + (0.03 if self.position_trend != 0 else 0.0)
+            change = self._rng_random.gauss(drift * seconds, math.sqrt(variance * seconds))
+            self._next_anchor_gap = max(0.0, self._anchor_gap + change)
+
+        # Every second changes the max speed by U(-5, 5) with a 10% chance
+        change = self._rng_random.gauss(0.0, math.sqrt(SPEED_CHANGE_PROBABILITY * 25 / 3 * seconds))
+        self._next_anchor_max_speed = max(min(self._anchor_max_speed + change, 340), 250)
+
+    def _handle_event(self, time: int, kind: int):
+        if kind == PIT_EVENT and not self.in_pit:
+            self.in_pit = True
+            self.pit_entered = True
+            self.pit_time_remaining = self._rng_random.randint(20, 30)
+            self.pit_exit_time = time + self.pit_time_remaining
+            self._schedule(self.pit_exit_time, PIT_EVENT)
+        elif kind == PIT_EVENT:
+            self.in_pit = False
+            self.pit_exited = True
+            self.pit_time_remaining = 0
+            self.pits += 1
+            self.stint_start_time = time
+            self.pit_stop_due = time + self._rng_random.randint(1200, 2400)
+            self.pic = min(self.pic + self._rng_random.randint(3, 8), 20)
+            self._schedule(self.pit_stop_due, PIT_EVENT)
+        elif kind == LAP_EVENT and self.in_pit:
+            # Laps are not counted in the pit, an overdue lap ends at pit exit
+            self._schedule(self.pit_exit_time, LAP_EVENT)
+        elif kind == LAP_EVENT:
+            self.last_lap = self._calculate_lap_time()
+            self.laps += 1
+            self.lap_completed = True
+            self.lap_start_time = time
+            self.best_lap = min(self.best_lap, self.last_lap)
+            self._schedule(time + math.ceil(self.base_lap_time), LAP_EVENT)
+        elif self.in_pit:
+            # No position changes in the pit, tries resume from pit exit
+            self._schedule(self._next_position_change(self.pit_exit_time - 1), POSITION_EVENT)
+        else:
+            performance_factor = self._rng_random.uniform(-1, 1)
+            if performance_factor > 0.3 and self.pic > 1:
+                self.pic -= 1
+                self.position_trend = 1
+            elif performance_factor < -0.3 and self.pic < 20:
+                self.pic += 1
+                self.position_trend = -1
+            else:
+                self.position_trend = 0
+            self._schedule(self._next_position_change(time), POSITION_EVENT)
+
+    def process_next_event(self):
+        """Handles the earliest scheduled event and draws the gap and max speed up to the one after it."""
+        time, kind = heapq.heappop(self._events)
+        self.current_time = time
+        self._anchor_time = time
+        self._anchor_gap = self._next_anchor_gap
+        self._anchor_max_speed = self._next_anchor_max_speed
+        self._handle_event(time, kind)
+        if self.pic == 1:
+            self._anchor_gap = 0.0
+        self._sample_anchor()
+
+    def advance_to(self, time: int):
+        """
+        Advances the car to race second `time`, handling every event up to and including it.
+
+        The lap_completed, pit_entered and pit_exited flags tell whether that happened since the
+        previous advance.
+        """
+        self.lap_completed = False
+        self.pit_entered = False
+        self.pit_exited = False
+        while self.next_event_time <= time:
+            self.process_next_event()
+        self.current_time = time
+        self._interpolate()
+
+    def _interpolate(self):
+        """Sets the gap and max speed of the current time between the last and the next event."""
+        fraction = (self.current_time - self._anchor_time) / (self._next_anchor_time - self._anchor_time)
+        self.gap = self._anchor_gap + fraction * (self._next_anchor_gap - self._anchor_gap)
+        self.max_speed = self._anchor_max_speed + fraction * (self._next_anchor_max_speed - self._anchor_max_speed)
+        if self.in_pit:
+            self.pit_time_remaining = self.pit_exit_time - self.current_time
+
+    def export_state(self) -> bytes:
+        """Export the event queue and the gap and max speed anchors, followed by the DriverRaceSimulator state"""
+        return b''.join([
+            _STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, len(self._events)),
+            _STATE_FIELDS.pack(
+                self.pit_exit_time, self._anchor_time, self._anchor_gap, self._anchor_max_speed,
+                self._next_anchor_time, self._next_anchor_gap, self._next_anchor_max_speed,
+            ),
+            # The heap list is stored as it is, its order stays a valid heap
+            *[_EVENT.pack(time, kind) for time, kind in self._events],
+            super().export_state(),
+        ])
+
+    def import_state(self, state: bytes):
+        """Restore a state written by export_state(), advancing continues from it"""
+        _, _, num_events = checkpoint.check_header(state, _STATE_HEADER, STATE_MAGIC, STATE_VERSION)
+        (
+            self.pit_exit_time, self._anchor_time, self._anchor_gap, self._anchor_max_speed,
+            self._next_anchor_time, self._next_anchor_gap, self._next_anchor_max_speed,
+        ) = _STATE_FIELDS.unpack_from(state, _STATE_HEADER.size)
+        offset = _STATE_HEADER.size + _STATE_FIELDS.size
+        self._events = [_EVENT.unpack_from(state, offset + i * _EVENT.size) for i in range(num_events)]
+        super().import_state(state[offset + num_events * _EVENT.size:])
+
+    def generate_next_data_point(self) -> dict:
+        """
+        Advances by one second, like DriverRaceSimulator.generate_next_data_point()
+
+        Returns:
+            Dictionary with all race data including status information
+        """
+        self.advance_to(self.current_time + 1)
+        return self.data_point()
+
+    def data_point(self) -> dict:
+        """Race data of the current time, in the format of DriverRaceSimulator.generate_next_data_point()"""
+        return {
+            'PiC': self.pic,
+            'car_name': self.car_name,
+            'laps': self.laps,
+            'last_lap': round(self.last_lap, 3) if self.last_lap > 0 else 0.0,
+            'best_lap': round(self.best_lap, 3) if self.best_lap != float('inf') else 0.0,
+            'gap': round(self.gap, 3),
+            'pits': self.pits,
+            'max_speed': round(self.max_speed, 1),
+            'driver_name': self.driver_name,
+            'race_time': f"{self.current_time // 60:02d}:{self.current_time % 60:02d}",
+            'status': 'PIT' if self.in_pit else 'RUNNING',
+            'pit_time_remaining': self.pit_time_remaining if self.in_pit else 0,
+            'next_pit_in': max(0, self.pit_stop_due - self.current_time) if not self.in_pit else 0
+        }
+
+
+class RaceEventScheduler:
+    """
+    Advances a whole field of EventDrivenDriverSimulator from event to event.
+
+    The cars are kept on a heap keyed by their next event time, so advancing the field
+    handles events in time order at O(log cars) each and does not visit cars without events.
+    """
+
+    def __init__(self, simulators: list):
+        """
+        Args:
+            simulators: The EventDrivenDriverSimulator of every car, all at the same race time
+        """
+        self.simulators = list(simulators)
+        self.current_time = self.simulators[0].current_time
+        self._cars = [(simulator.next_event_time, car) for car, simulator in enumerate(self.simulators)]
+        heapq.heapify(self._cars)
+        self.events_processed = 0
+
+    def advance_to(self, time: int):
+        """Advances every car to race second `time`."""
+        for simulator in self.simulators:
+            simulator.lap_completed = simulator.pit_entered = simulator.pit_exited = False
+
+        while self._cars[0][0] <= time:
+            _, car = self._cars[0]
+            simulator = self.simulators[car]
+            simulator.process_next_event()
+            heapq.heapreplace(self._cars, (simulator.next_event_time, car))
+            self.events_processed += 1
+
+        self.current_time = time
+        for simulator in self.simulators:
+            simulator.current_time = time
+            simulator._interpolate()
+
+    def advance(self, seconds: int) -> list:
+        """
+        Advances every car by `seconds`.
+
+        Returns:
+            The race data of every car at the new time
+        """
+        self.advance_to(self.current_time + seconds)
+        return [simulator.data_point() for simulator in self.simulators]
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    field = [EventDrivenDriverSimulator(f"Driver {i + 1}", f"Car {i + 1}", starting_position=i + 1, random_seed=i) for i in range(10)]
+    scheduler = RaceEventScheduler(field)
+
+    started = time.perf_counter()
+    data = scheduler.advance(24 * 3600)
+    elapsed = time.perf_counter() - started
+    print(f"Simulated 24h for {len(field)} cars in {elapsed * 1000:.1f} ms ({scheduler.events_processed} events).")
+    for row in sorted(data, key=lambda row: row['PiC']):
+        print(f"P{row['PiC']:<3}{row['car_name']:<8}laps {row['laps']:<5}pits {row['pits']:<4}gap +{row['gap']}s")
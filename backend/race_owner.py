@@ -0,0 +1,74 @@
+"""
+Runs the race simulation in its own process and publishes every tick to shared memory.
+
+Start the owner first, then the HTTP workers with the same shared memory name:
+
+    python race_owner.py --name lemans_race
+    RACE_SHARED_MEMORY=lemans_race uvicorn main:app --workers 4
+
+The workers serve /stats, /schema and /palette from the shared state and answer the endpoints
+that need the race itself (/telemetry, /seek, /laps, /stints, /alerts) with 409; those are only
+available from a single server process without RACE_SHARED_MEMORY.
+
+Until the owner has published its first tick, and whenever it has not published for
+RACE_OWNER_TIMEOUT seconds (default 5), the workers answer /stats with 503. A restarted owner
+replaces the block, and the workers attach to the new one once the old one has gone stale.
+"""
+import argparse
+import os
+import signal
+import time
+
+# main.py must run the simulation itself in this process, not read the shared state
+os.environ.pop("RACE_SHARED_MEMORY", None)
+
+import main
+from shared_state import SharedRaceState
+
+
+def create_state(name: str) -> SharedRaceState:
+    """Creates the shared memory block, replacing one left behind by an owner that was killed."""
+    try:
+        return SharedRaceState(name, len(main.drivers), main.telemetry_channels, create=True)
+    except FileExistsError:
+        pass
+
+    try:
+        existing = SharedRaceState(name, len(main.drivers), main.telemetry_channels)
+    except ValueError:
+        # Written by another version of this code, which cannot be publishing to the workers of this one
+        existing = None
+    if existing is not None:
+        age = existing.age()
+        existing.close()
+        if age <= main.SHARED_RACE_STATE_TIMEOUT_SECONDS:
+            raise SystemExit(f"Another race owner is publishing to shared memory '{name}'.")
+
+    # Workers still attached to the old block notice that it is no longer written and attach to the new one
+    SharedRaceState.remove(name)
+    return SharedRaceState(name, len(main.drivers), main.telemetry_channels, create=True)
+
+
+def run(name: str, tick_seconds: float):
+    state = create_state(name)
+    # Stopping the owner with SIGTERM removes the shared memory block as well
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Publishing the race to shared memory '{name}' every {tick_seconds}s.")
+    try:
+        next_tick = time.monotonic()
+        while True:
+            state.write(main.advance_race())
+            next_tick += tick_seconds
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the race and publish it to shared memory for the HTTP workers.")
+    parser.add_argument("--name", default="lemans_race", help="Name of the shared memory block")
+    parser.add_argument("--tick", type=float, default=1.0, help="Seconds between two simulation ticks")
+    args = parser.parse_args()
+    run(args.name, args.tick)
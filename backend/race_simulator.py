@@ -1,8 +1,16 @@
-import random
+import struct
 import time
 
+import checkpoint
+import seeding
+
+STATE_MAGIC = b'DRSS'
+STATE_VERSION = 1
+_STATE_HEADER = struct.Struct('<4sH')
+_STATE_FIELDS = struct.Struct('<qiidddidqdq?iqi???')
+
 class DriverRaceSimulator:
-    def __init__(self, driver_name: str = "Driver 1", car_name: str = "Car 1", starting_position: int = 10):
+    def __init__(self, driver_name: str = "Driver 1", car_name: str = "Car 1", starting_position: int = 10, random_seed=None):
         """
         Initialize single driver race simulator
         
@@ -10,46 +18,54 @@ class DriverRaceSimulator:
             driver_name: Name of the driver
             car_name: Name/number of the car
             starting_position: Starting grid position
+            random_seed: Optional int or np.random.SeedSequence seeding every random draw of this simulator
         """
+        self._rng_random = seeding.python_random(seeding.seed_sequence(random_seed))
         self.driver_name = driver_name
         self.car_name = car_name
         self.current_time = 0
         self.lap_length_seconds = 90  # Average lap time in seconds
+        self.lap_length_meters = 13626  # Circuit de la Sarthe
         
         # Driver race data
         self.pic = starting_position  # Position in Classification
         self.laps = 0
         self.last_lap = 0.0
         self.best_lap = float('inf')
-        self.gap = random.uniform(5, 25) if starting_position > 1 else 0.0  # Gap to leader
+        self.gap = self._rng_random.uniform(5, 25) if starting_position > 1 else 0.0  # Gap to leader
         self.pits = 0
-        self.max_speed = random.uniform(280, 320)  # km/h
+        self.max_speed = self._rng_random.uniform(280, 320)  # km/h
         
         # Internal tracking variables
         self.lap_start_time = 0
-        self.base_lap_time = random.uniform(85, 95)  # Base lap time variation
-        self.pit_stop_due = random.randint(1200, 2400)  # When pit stop is due (seconds)
+        self.base_lap_time = self._rng_random.uniform(85, 95)  # Base lap time variation
+        self.pit_stop_due = self._rng_random.randint(1200, 2400)  # When pit stop is due (seconds)
         self.in_pit = False
         self.pit_time_remaining = 0
         self.stint_start_time = 0
         self.position_trend = 0  # Tracks if driver is gaining/losing positions
+        
+        # Boundaries crossed during the last update
+        self.lap_completed = False
+        self.pit_entered = False
+        self.pit_exited = False
     
     def _calculate_lap_time(self) -> float:
         """Calculate realistic lap time with variation"""
         base_time = self.base_lap_time
         
         # Add random variation (±2 seconds)
-        variation = random.uniform(-2, 2)
+        variation = self._rng_random.uniform(-2, 2)
         
         # Tire degradation effect (slower as stint progresses)
         stint_length = self.current_time - self.stint_start_time
         degradation = min(stint_length / 1000, 3)  # Max 3s degradation
         
         # Weather/track conditions
-        conditions = random.uniform(-1, 1)
+        conditions = self._rng_random.uniform(-1, 1)
         
         # Performance variation (driver having good/bad day)
-        performance = random.uniform(-0.5, 0.5)
+        performance = self._rng_random.uniform(-0.5, 0.5)
         
         return max(base_time + variation + degradation + conditions + performance, 75)
     
@@ -60,15 +76,17 @@ class DriverRaceSimulator:
             if self.pit_time_remaining <= 0:
                 # Exit pit
                 self.in_pit = False
+                self.pit_exited = True
                 self.pits += 1
                 self.stint_start_time = self.current_time
-                self.pit_stop_due = self.current_time + random.randint(1200, 2400)
+                self.pit_stop_due = self.current_time + self._rng_random.randint(1200, 2400)
                 # Lose positions during pit stop
-                self.pic = min(self.pic + random.randint(3, 8), 20)
+                self.pic = min(self.pic + self._rng_random.randint(3, 8), 20)
         elif self.current_time >= self.pit_stop_due and not self.in_pit:
             # Enter pit
             self.in_pit = True
-            self.pit_time_remaining = random.randint(20, 30)  # 20-30 second pit stop
+            self.pit_entered = True
+            self.pit_time_remaining = self._rng_random.randint(20, 30)  # 20-30 second pit stop
     
     def _update_position(self):
         """Update race position with realistic changes"""
@@ -78,9 +96,9 @@ class DriverRaceSimulator:
         # Position changes based on performance and race dynamics
         position_change_chance = 0.05  # 5% chance per second
         
-        if random.random() < position_change_chance:
+        if self._rng_random.random() < position_change_chance:
             # Determine if gaining or losing position
-            performance_factor = random.uniform(-1, 1)
+            performance_factor = self._rng_random.uniform(-1, 1)
             
             if performance_factor > 0.3 and self.pic > 1:
                 # Gain position (overtake)
@@ -99,13 +117,13 @@ class DriverRaceSimulator:
             self.gap = 0.0
         else:
             # Gap changes based on relative performance
-            gap_change = random.uniform(-0.5, 0.5)
+            gap_change = self._rng_random.uniform(-0.5, 0.5)
             
             # Position influence on gap
             if self.position_trend == 1:  # Gaining positions
-                gap_change -= random.uniform(0.2, 0.8)
+                gap_change -= self._rng_random.uniform(0.2, 0.8)
             elif self.position_trend == -1:  # Losing positions
-                gap_change += random.uniform(0.2, 0.8)
+                gap_change += self._rng_random.uniform(0.2, 0.8)
             
             # Pit stop impact
             if self.in_pit:
@@ -116,10 +134,41 @@ class DriverRaceSimulator:
     def _update_max_speed(self):
         """Update max speed with realistic variation"""
         # Occasional speed updates (not every second)
-        if random.random() < 0.1:  # 10% chance per second
-            speed_variation = random.uniform(-5, 5)
+        if self._rng_random.random() < 0.1:  # 10% chance per second
+            speed_variation = self._rng_random.uniform(-5, 5)
             self.max_speed = max(min(self.max_speed + speed_variation, 340), 250)
     
+    def track_distance(self) -> float:
+        """Total distance covered on track in meters (completed laps plus current lap progress)"""
+        lap_progress = min((self.current_time - self.lap_start_time) / self.base_lap_time, 1.0)
+        return (self.laps + lap_progress) * self.lap_length_meters
+    
+    def average_speed(self) -> float:
+        """Average on-track speed in meters per second, derived from the base lap time"""
+        return self.lap_length_meters / self.base_lap_time
+    
+    def export_state(self) -> bytes:
+        """Export race and random generator state as compact binary, without names and configuration"""
+        return b''.join([
+            _STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION),
+            _STATE_FIELDS.pack(
+                self.current_time, self.pic, self.laps, self.last_lap, self.best_lap, self.gap, self.pits, self.max_speed,
+                self.lap_start_time, self.base_lap_time, self.pit_stop_due, self.in_pit, self.pit_time_remaining,
+                self.stint_start_time, self.position_trend, self.lap_completed, self.pit_entered, self.pit_exited,
+            ),
+            checkpoint.pack_python_random(self._rng_random),
+        ])
+    
+    def import_state(self, state: bytes):
+        """Restore a state written by export_state(), the next data point continues from it"""
+        checkpoint.check_header(state, _STATE_HEADER, STATE_MAGIC, STATE_VERSION)
+        (
+            self.current_time, self.pic, self.laps, self.last_lap, self.best_lap, self.gap, self.pits, self.max_speed,
+            self.lap_start_time, self.base_lap_time, self.pit_stop_due, self.in_pit, self.pit_time_remaining,
+            self.stint_start_time, self.position_trend, self.lap_completed, self.pit_entered, self.pit_exited,
+        ) = _STATE_FIELDS.unpack_from(state, _STATE_HEADER.size)
+        checkpoint.unpack_python_random(self._rng_random, state, _STATE_HEADER.size + _STATE_FIELDS.size)
+    
     def generate_next_data_point(self) -> dict:
         """
         Generate next data point (1 second update)
@@ -128,6 +177,9 @@ class DriverRaceSimulator:
             Dictionary with all race data including status information
         """
         self.current_time += 1
+        self.lap_completed = False
+        self.pit_entered = False
+        self.pit_exited = False
         
         # Handle pit stops
         self._handle_pit_stop()
@@ -143,6 +195,7 @@ class DriverRaceSimulator:
                 actual_lap_time = self._calculate_lap_time()
                 self.last_lap = actual_lap_time
                 self.laps += 1
+                self.lap_completed = True
                 self.lap_start_time = self.current_time
                 
                 # Update best lap
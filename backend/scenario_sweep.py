@@ -0,0 +1,256 @@
+"""
+Runs what-if race simulations over a grid of RaceDataSimulator parameters.
+
+Every combination of the parameter grid is simulated for every seed, in parallel and as fast as
+possible, and reduced to summary metrics: time above 90% of every channel's range, time in the
+rain and peak rainfall, peak and mean anomaly score and the number of alerts raised per rule. Results are cached on disk keyed by the
+parameters, the seed, the race length and a hash of the simulation and scoring code, the risk scorer
+and the model artifact or training data it is built from, so repeated or overlapping sweeps only
+simulate the runs they have not seen before. Like main.py, the anomaly score comes from the
+multivariate model unless RISK_SCORER=quantile (or --scorer quantile) is given.
+
+Usage:
+    python scenario_sweep.py --param RAINFALL_MAX_INTENSITY=5,10,20 --param RAINFALL_EVENT_START_SECOND=3600 --seeds 0 1 2 --hours 6
+
+The rain starts after six hours by default, so sweeping it needs a longer race or an earlier
+RAINFALL_EVENT_START_SECOND; sweeps of an event the race never reaches are refused.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import race_data_simulator
+import telemetry_schema
+from alerts import DEFAULT_ALERT_RULES, AlertEngine
+from model.anomaly_detection import MultivariateAnomalyDetection, QuantileAnomalyDetection
+from telemetry_filter import risk_model_filter
+from train_risk_model import DEFAULT_ARTIFACT_FILE
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BACKEND_DIR, "sweep_cache")
+TRAIN_DATA_FILE = os.path.join(BACKEND_DIR, "model", "train_data.csv")
+
+# Rainfall above this intensity (mm/h) counts as rain, like the track temperature effect in race_data_simulator.py
+RAIN_THRESHOLD = 0.5
+
+# Parameters of a scheduled event, by the prefix of their names, and the parameter holding its start second
+EVENT_START_PARAMS = {'RAINFALL_': 'RAINFALL_EVENT_START_SECOND'}
+
+# A change to any of these invalidates the cached results
+CODE_FILES = [
+    "race_data_simulator.py", "race_simulator.py", "seeding.py", "telemetry_schema.py", "alerts.py", "telemetry_filter.py", "scenario_sweep.py",
+    os.path.join("model", "anomaly_detection.py"),
+]
+
+RISK_SCORERS = ["multivariate", "quantile"]
+
+
+def default_risk_scorer() -> str:
+    """The risk scorer main.py uses, selected by the RISK_SCORER environment variable."""
+    return "quantile" if os.environ.get("RISK_SCORER") == "quantile" else "multivariate"
+
+
+def model_source_file(scorer: str) -> str:
+    """The file the risk model of a scorer is built from: the trained artifact if present, otherwise the bundled training data."""
+    if scorer == "multivariate" and os.path.exists(DEFAULT_ARTIFACT_FILE):
+        return DEFAULT_ARTIFACT_FILE
+    return TRAIN_DATA_FILE
+
+
+def load_anomaly_detection(scorer: str):
+    """Loads the same risk model as main.py does for the scorer."""
+    if scorer == "quantile":
+        return QuantileAnomalyDetection(TRAIN_DATA_FILE)
+    if model_source_file(scorer) == DEFAULT_ARTIFACT_FILE:
+        return MultivariateAnomalyDetection.load(DEFAULT_ARTIFACT_FILE)
+    return MultivariateAnomalyDetection(TRAIN_DATA_FILE)
+
+
+def code_version(scorer: str) -> str:
+    """Hash of everything the results depend on besides the run itself: the code, the scorer and the data of its model."""
+    version = hashlib.sha256()
+    for filename in CODE_FILES + [model_source_file(scorer)]:
+        with open(os.path.join(BACKEND_DIR, filename), 'rb') as f:
+            version.update(f.read())
+    version.update(scorer.encode())
+    return version.hexdigest()[:12]
+
+
+def run_key(params: dict, seed: int, hours: int, version: str) -> str:
+    return hashlib.sha256(json.dumps([params, seed, hours, version], sort_keys=True).encode()).hexdigest()[:24]
+
+
+def simulate_run(run: dict) -> dict:
+    """
+    Simulates one race with the given parameters and seed and reduces it to summary metrics.
+
+    Args:
+        run: The simulator parameters to override, the seed, the race length in hours and the risk scorer
+    """
+    race_sim = race_data_simulator.RaceDataSimulator(num_hours=run['hours'], random_seed=run['seed'])
+    for name, value in run['params'].items():
+        setattr(race_sim, name, value)
+    # The initial state is taken from the *_BASE parameters, so it is set up again with the overrides
+    race_sim.initialize_simulation()
+
+    channels = telemetry_schema.CHANNEL_NAMES
+    anomaly_detection = load_anomaly_detection(run['scorer'])
+    alert_engine = AlertEngine(DEFAULT_ALERT_RULES, channels, 1)
+    telemetry_filter = risk_model_filter(1)
+
+    records = telemetry_schema.empty_records(race_sim.total_samples)
+    telemetry = telemetry_schema.as_matrix(records)
+    smoothed = np.empty_like(telemetry)
+    alerts_raised = dict.fromkeys((rule['name'] for rule in DEFAULT_ALERT_RULES), 0)
+    for tick in range(race_sim.total_samples):
+        race_sim.generate_next_record(records, tick)
+        smoothed[tick] = telemetry_filter.update(telemetry[tick:tick + 1])[0]
+        for _, rule, firing in alert_engine.evaluate(telemetry[tick:tick + 1], smoothed[tick:tick + 1]):
+            if firing:
+                alerts_raised[DEFAULT_ALERT_RULES[rule]['name']] += 1
+
+    thresholds = {channel: low + 0.9 * (high - low) for channel, (low, high) in telemetry_schema.CHANNEL_BOUNDS.items() if np.isfinite(high)}
+    rainfall = telemetry[:, channels.index('rainfall_intensity')]
+    anomaly = anomaly_detection.calculate_anomaly_scores(smoothed[:, [channels.index(column) for column in anomaly_detection.columns]])
+
+    return {
+        'params': run['params'],
+        'seed': run['seed'],
+        'hours': run['hours'],
+        'scorer': run['scorer'],
+        'metrics': {
+            'time_above_seconds': {
+                channel: int((telemetry[:, channels.index(channel)] > threshold).sum()) * race_sim.sample_rate_seconds
+                for channel, threshold in thresholds.items()
+            },
+            'rain_seconds': int((rainfall > RAIN_THRESHOLD).sum()) * race_sim.sample_rate_seconds,
+            'peak_rainfall_intensity': round(float(rainfall.max()), 4),
+            'peak_anomaly': round(float(anomaly.max()), 4),
+            'mean_anomaly': round(float(anomaly.mean()), 4),
+            'alerts_raised': alerts_raised,
+        },
+    }
+
+
+def check_event_windows(runs: list, defaults: race_data_simulator.RaceDataSimulator):
+    """
+    Checks that every run reaches the start of the events whose parameters are swept.
+
+    Raises:
+        ValueError: If a run ends before a swept event starts, so the sweep could not show any effect
+    """
+    for run in runs:
+        for prefix, start_param in EVENT_START_PARAMS.items():
+            if not any(name.startswith(prefix) for name in run['params']):
+                continue
+            start = run['params'].get(start_param, getattr(defaults, start_param))
+            if start >= run['hours'] * 3600:
+                raise ValueError(f"{start_param} is {start:.0f}s, after the end of the {run['hours']}h race, "
+                                 f"so the swept {prefix.rstrip('_').lower()} parameters have no effect; "
+                                 f"sweep a longer race or an earlier {start_param}")
+
+
+def run_sweep(grid: dict, seeds: list, hours: int, workers: int = 1, cache_dir: str = DEFAULT_CACHE_DIR, scorer: str | None = None) -> list:
+    """
+    Simulates every combination of the parameter grid for every seed, reusing cached runs.
+
+    Args:
+        grid: Values to try per RaceDataSimulator parameter, e.g. {'RAINFALL_MAX_INTENSITY': [5, 10]}
+        seeds: Seeds to run every combination with
+        hours: Length of every race in hours
+        workers: Number of worker processes
+        cache_dir: Directory the results of single runs are cached in
+        scorer: Risk scorer of the anomaly metrics, one of RISK_SCORERS; defaults to the one main.py uses
+
+    Returns:
+        The result of every run, in grid order
+
+    Raises:
+        ValueError: If a parameter does not exist or a swept event starts after the end of the race
+    """
+    defaults = race_data_simulator.RaceDataSimulator(num_hours=1)
+    for name in grid:
+        if not name.isupper() or not hasattr(defaults, name):
+            raise ValueError(f"'{name}' is not a RaceDataSimulator parameter")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    scorer = scorer or default_risk_scorer()
+    version = code_version(scorer)
+    names = sorted(grid)
+    runs = [
+        {'params': dict(zip(names, values)), 'seed': seed, 'hours': hours, 'scorer': scorer}
+        for values in itertools.product(*(grid[name] for name in names))
+        for seed in seeds
+    ]
+    check_event_windows(runs, defaults)
+
+    results = [None] * len(runs)
+    missing = []
+    for i, run in enumerate(runs):
+        cache_file = os.path.join(cache_dir, f"{run_key(run['params'], run['seed'], hours, version)}.json")
+        if os.path.exists(cache_file):
+            with open(cache_file) as f:
+                results[i] = json.load(f)
+        else:
+            missing.append(i)
+    print(f"{len(runs) - len(missing)} of {len(runs)} runs found in the cache, simulating {len(missing)}.")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            simulated = list(executor.map(simulate_run, [runs[i] for i in missing]))
+    else:
+        simulated = [simulate_run(runs[i]) for i in missing]
+
+    for i, result in zip(missing, simulated):
+        results[i] = result
+        with open(os.path.join(cache_dir, f"{run_key(runs[i]['params'], runs[i]['seed'], hours, version)}.json"), 'w') as f:
+            json.dump(result, f)
+
+    return results
+
+
+def parse_param(argument: str):
+    name, values = argument.split("=", 1)
+    return name, [float(value) for value in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run what-if race simulations over a parameter grid.")
+    parser.add_argument("--param", action="append", type=parse_param, default=[], metavar="NAME=V1,V2,...", help="Values to try for a RaceDataSimulator parameter")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="Seeds to run every combination with")
+    parser.add_argument("--hours", type=int, default=6, help="Length of every race in hours")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory the results of single runs are cached in")
+    parser.add_argument("--scorer", choices=RISK_SCORERS, default=default_risk_scorer(), help="Risk scorer of the anomaly metrics, defaults to RISK_SCORER like main.py")
+    parser.add_argument("--output", help="Path of the JSON file to save all results to")
+    args = parser.parse_args()
+
+    try:
+        results = run_sweep(dict(args.param), args.seeds, args.hours, args.workers, args.cache_dir, args.scorer)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Average over the seeds of every combination
+    combinations = {}
+    for result in results:
+        combinations.setdefault(json.dumps(result['params'], sort_keys=True), []).append(result['metrics'])
+    for params, metrics in combinations.items():
+        peak = np.mean([m['peak_anomaly'] for m in metrics])
+        mean = np.mean([m['mean_anomaly'] for m in metrics])
+        rain = np.mean([m['rain_seconds'] for m in metrics])
+        alerts = np.mean([sum(m['alerts_raised'].values()) for m in metrics])
+        print(f"{params}: peak anomaly {peak:.3f}, mean anomaly {mean:.3f}, rain {rain:.0f}s, alerts raised {alerts:.1f} (mean of {len(metrics)} seeds)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
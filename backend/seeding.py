@@ -0,0 +1,21 @@
+import random
+
+import numpy as np
+
+
+def seed_sequence(random_seed=None) -> np.random.SeedSequence:
+    """
+    Turns a seed argument into a SeedSequence.
+
+    Args:
+        random_seed: An int, an existing SeedSequence (e.g. one spawned for a parallel job),
+                     or None for fresh entropy
+    """
+    if isinstance(random_seed, np.random.SeedSequence):
+        return random_seed
+    return np.random.SeedSequence(random_seed)
+
+
+def python_random(seed_seq: np.random.SeedSequence) -> random.Random:
+    """Creates a `random.Random` generator seeded from a SeedSequence."""
+    return random.Random(int.from_bytes(seed_seq.generate_state(4).tobytes(), 'little'))
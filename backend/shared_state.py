@@ -0,0 +1,178 @@
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+LAYOUT_VERSION = 2
+
+# Numeric fields of a /stats row, every block is a (cars x fields) float64 array
+DRIVER_FIELDS = ['PiC', 'laps', 'last_lap', 'best_lap', 'gap', 'pits', 'max_speed', 'race_seconds', 'in_pit', 'pit_time_remaining', 'next_pit_in']
+PROXIMITY_FIELDS = ['ahead_car', 'ahead_distance', 'ahead_interval', 'behind_car', 'behind_distance', 'behind_interval']
+SCORE_FIELDS = ['anomaly', 'risk', 'risk_color']
+
+# sequence, layout version, number of cars, number of channels, owner id, time of the last write in ns
+HEADER_SIZE = 6
+
+
+class SharedRaceState:
+    """
+    The /stats rows of the whole field in a shared memory block with a fixed layout.
+
+    One process owns the simulation and writes every tick; any number of HTTP workers attach
+    and read the block through NumPy views without copying it. Consistency is guaranteed by a
+    sequence lock: the writer makes the sequence odd while it writes and even again when done,
+    readers retry if the sequence was odd or changed while they were reading.
+
+    Every block gets a random owner id when it is created, and every write stamps the header with
+    the time, so workers can tell a block nobody writes anymore (the owner died or was restarted
+    under the same name with a new block) from a live one.
+    """
+
+    def __init__(self, name: str, num_cars: int, channels: list, create: bool = False):
+        """
+        Args:
+            name: Name of the shared memory block
+            num_cars: Number of cars in the field
+            channels: Telemetry channel names, in the order of the data dicts
+            create: Create the block (simulation owner) instead of attaching to an existing one (workers)
+        """
+        self.num_cars = num_cars
+        self.channels = list(channels)
+        self._owner = create
+
+        blocks = [len(DRIVER_FIELDS), len(self.channels), len(PROXIMITY_FIELDS), len(SCORE_FIELDS)]
+        size = (HEADER_SIZE + num_cars * sum(blocks)) * 8
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        if not create:
+            # Only the owner may remove the block, not the resource tracker of an attached worker on exit
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+            if self._shm.size < size:
+                self._shm.close()
+                raise ValueError(f"Shared race state '{name}' has {self._shm.size} bytes, expected {size}")
+
+        self._header = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=self._shm.buf)
+        offset = HEADER_SIZE * 8
+        views = []
+        for fields in blocks:
+            views.append(np.ndarray((num_cars, fields), dtype=np.float64, buffer=self._shm.buf, offset=offset))
+            offset += num_cars * fields * 8
+        self.driver, self.telemetry, self.proximity, self.scores = views
+
+        if create:
+            self._header[:] = [0, LAYOUT_VERSION, num_cars, len(self.channels), int.from_bytes(os.urandom(7), 'little'), 0]
+        elif list(self._header[1:4]) != [LAYOUT_VERSION, num_cars, len(self.channels)]:
+            layout = list(self._header[1:4])
+            self.close()
+            raise ValueError(f"Shared race state '{name}' has layout {layout}, expected {[LAYOUT_VERSION, num_cars, len(self.channels)]}")
+
+    @property
+    def sequence(self) -> int:
+        """Number of writes started times two, 0 until the owner has written the first tick."""
+        return int(self._header[0])
+
+    @property
+    def owner_id(self) -> int:
+        return int(self._header[4])
+
+    def age(self) -> float:
+        """Seconds since the owner last wrote, infinite before the first write."""
+        written_at = int(self._header[5])
+        return (time.time_ns() - written_at) / 1e9 if written_at else float('inf')
+
+    @staticmethod
+    def remove(name: str):
+        """Removes a block left behind by an owner that was killed before it could remove it."""
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+
+    def write(self, data: list):
+        """Writes the /stats rows of one tick."""
+        self._header[0] += 1
+        self._header[5] = time.time_ns()
+        for car, row in enumerate(data):
+            driver_data = row["driver_data"]
+            minutes, seconds = driver_data["race_time"].split(":")
+            self.driver[car] = [
+                driver_data["PiC"], driver_data["laps"], driver_data["last_lap"], driver_data["best_lap"], driver_data["gap"],
+                driver_data["pits"], driver_data["max_speed"], int(minutes) * 60 + int(seconds), driver_data["status"] == "PIT",
+                driver_data["pit_time_remaining"], driver_data["next_pit_in"],
+            ]
+            self.telemetry[car] = [row["data"][channel] for channel in self.channels]
+            proximity = row["proximity"]
+            self.proximity[car] = np.nan if proximity is None else [proximity[field] for field in PROXIMITY_FIELDS]
+            self.scores[car] = [row[field] for field in SCORE_FIELDS]
+        self._header[0] += 1
+
+    def read(self, car_names: list, driver_names: list, timeout: float = 1.0) -> list:
+        """
+        Builds the /stats rows from the latest complete tick.
+
+        Args:
+            car_names: Name of every car, names are static and not kept in shared memory
+            driver_names: Name of every driver
+            timeout: Seconds to wait for a write to finish, a write takes far less unless the owner died during it
+
+        Raises:
+            TimeoutError: If no complete tick could be read within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            sequence = self.sequence
+            if sequence % 2 == 1:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("The race owner did not finish writing the tick")
+                time.sleep(0)
+                continue
+
+            driver = self.driver.tolist()
+            telemetry = self.telemetry.tolist()
+            proximity = self.proximity.tolist()
+            scores = self.scores.tolist()
+
+            if self.sequence == sequence:
+                break
+
+        data = []
+        for car in range(self.num_cars):
+            fields = dict(zip(DRIVER_FIELDS, driver[car]))
+            race_seconds = int(fields["race_seconds"])
+            in_pit = bool(fields["in_pit"])
+            row_proximity = None
+            if not np.isnan(proximity[car][0]):
+                row_proximity = dict(zip(PROXIMITY_FIELDS, proximity[car]))
+                row_proximity["ahead_car"] = int(row_proximity["ahead_car"])
+                row_proximity["behind_car"] = int(row_proximity["behind_car"])
+            anomaly, risk, risk_color = scores[car]
+
+            data.append({
+                "driver_data": {
+                    "PiC": int(fields["PiC"]),
+                    "car_name": car_names[car],
+                    "laps": int(fields["laps"]),
+                    "last_lap": fields["last_lap"],
+                    "best_lap": fields["best_lap"],
+                    "gap": fields["gap"],
+                    "pits": int(fields["pits"]),
+                    "max_speed": fields["max_speed"],
+                    "driver_name": driver_names[car],
+                    "race_time": f"{race_seconds // 60:02d}:{race_seconds % 60:02d}",
+                    "status": "PIT" if in_pit else "RUNNING",
+                    "pit_time_remaining": int(fields["pit_time_remaining"]),
+                    "next_pit_in": int(fields["next_pit_in"]),
+                },
+                "data": dict(zip(self.channels, telemetry[car])),
+                "proximity": row_proximity,
+                "anomaly": anomaly,
+                "risk": risk,
+                "risk_color": int(risk_color),
+            })
+        return data
+
+    def close(self):
+        """Detaches from the block, the owner also removes it."""
+        self._header = self.driver = self.telemetry = self.proximity = self.scores = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,180 @@
+"""
+Soak benchmark that runs the complete backend tick loop for a full 24-hour race in accelerated time.
+
+Every tick does what a /stats request does: simulate the field, score it, record alerts, lap
+aggregates and checkpoints, and serialize the response to JSON. Ticks run back to back without
+waiting, so the 86,400 ticks of a Le Mans race take minutes instead of a day. Per simulated hour
+the process RSS, the memory traced by tracemalloc with its number of allocated blocks, and the
+tick latency percentiles are recorded.
+
+Memory and latency are compared between the end of the warm-up and the last hour; the run fails
+(exit code 1) if either drifts beyond the configured bounds, and the allocation sites that grew
+the most are listed to point at the leak.
+
+RSS is read from /proc and is only available on Linux. Tracing allocations slows every tick
+down about tenfold, use --no-tracemalloc for a quick run that measures undisturbed latencies.
+
+Usage:
+    python soak_test.py --hours 24 --output load_results/soak.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Like race_owner.py, the soak runs the simulation in this process instead of reading shared memory,
+# and it starts a fresh race that neither resumes from nor overwrites a checkpoint file
+os.environ.pop("RACE_SHARED_MEMORY", None)
+os.environ.pop("RACE_CHECKPOINT_FILE", None)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import main
+
+TICKS_PER_HOUR = 3600
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None when /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def traced_blocks(snapshot: tracemalloc.Snapshot) -> int:
+    return sum(stat.count for stat in snapshot.statistics('filename'))
+
+
+def top_growth(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int = 10) -> list:
+    """The allocation sites whose traced memory grew the most between two snapshots."""
+    return [
+        {'site': str(stat.traceback), 'size_diff_kb': round(stat.size_diff / 1024, 1), 'count_diff': stat.count_diff}
+        for stat in after.compare_to(before, 'lineno')[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def tick() -> float:
+    """Runs one tick of the backend, including the JSON serialization of /stats, and returns its latency."""
+    started = time.perf_counter()
+    JSONResponse(jsonable_encoder(main.advance_race())).body
+    return time.perf_counter() - started
+
+
+def run_soak(hours: int, trace: bool) -> dict:
+    """
+    Runs the tick loop for `hours` simulated hours.
+
+    Args:
+        hours: Length of the race in hours
+        trace: Trace allocations with tracemalloc
+
+    Returns:
+        One entry per simulated hour with its memory and latency, and the tracemalloc snapshots
+        taken at the end of every hour (empty without tracing)
+    """
+    if trace:
+        tracemalloc.start()
+
+    timeline = []
+    snapshots = []
+    started = time.monotonic()
+    for hour in range(hours):
+        latencies = np.array([tick() for _ in range(TICKS_PER_HOUR)])
+
+        entry = {
+            'hour': hour + 1,
+            'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+            'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+            'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+            'max_ms': round(float(latencies.max()) * 1000, 3),
+        }
+        rss = rss_bytes()
+        entry['rss_mb'] = round(rss / 2 ** 20, 2) if rss is not None else None
+        if trace:
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            snapshots.append(snapshot)
+            entry['traced_mb'] = round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 2)
+            entry['traced_blocks'] = traced_blocks(snapshot)
+        timeline.append(entry)
+        print(f"Hour {hour + 1}/{hours}: p95 {entry['p95_ms']}ms, RSS {entry['rss_mb']}MB"
+              + (f", traced {entry['traced_mb']}MB in {entry['traced_blocks']} blocks" if trace else "")
+              + f" ({time.monotonic() - started:.0f}s elapsed)")
+
+    if trace:
+        tracemalloc.stop()
+    return {'timeline': timeline, 'snapshots': snapshots}
+
+
+def check_drift(timeline: list, warmup_hours: int, max_rss_growth_mb: float, max_traced_growth_mb: float, max_latency_ratio: float) -> list:
+    """
+    Compares the last hour against the end of the warm-up.
+
+    Returns:
+        A description of every bound that was exceeded, empty if the run passed
+    """
+    baseline = timeline[min(warmup_hours, len(timeline)) - 1]
+    last = timeline[-1]
+    failures = []
+
+    if baseline['rss_mb'] is not None and last['rss_mb'] - baseline['rss_mb'] > max_rss_growth_mb:
+        failures.append(f"RSS grew by {last['rss_mb'] - baseline['rss_mb']:.1f}MB after the warm-up, the bound is {max_rss_growth_mb}MB")
+    if 'traced_mb' in last and last['traced_mb'] - baseline['traced_mb'] > max_traced_growth_mb:
+        failures.append(f"Traced memory grew by {last['traced_mb'] - baseline['traced_mb']:.1f}MB after the warm-up, the bound is {max_traced_growth_mb}MB")
+    if last['p95_ms'] > baseline['p95_ms'] * max_latency_ratio:
+        failures.append(f"p95 tick latency went from {baseline['p95_ms']}ms to {last['p95_ms']}ms, the bound is {max_latency_ratio}x")
+    return failures
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Run the backend tick loop for a full race and check memory and latency drift.")
+    parser.add_argument("--hours", type=int, default=24, help="Length of the race in simulated hours")
+    parser.add_argument("--warmup-hours", type=int, default=1, help="Hours before the baseline is taken")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50, help="Allowed RSS growth from the baseline to the last hour")
+    parser.add_argument("--max-traced-growth-mb", type=float, default=25, help="Allowed growth of the memory traced by tracemalloc")
+    parser.add_argument("--max-latency-ratio", type=float, default=1.5, help="Allowed ratio of the last hour's p95 tick latency to the baseline's")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Do not trace allocations, for undisturbed latencies")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to")
+    args = parser.parse_args()
+
+    if args.hours <= args.warmup_hours:
+        parser.error("--hours has to be larger than --warmup-hours")
+
+    result = run_soak(args.hours, not args.no_tracemalloc)
+    failures = check_drift(result['timeline'], args.warmup_hours, args.max_rss_growth_mb, args.max_traced_growth_mb, args.max_latency_ratio)
+    growth = []
+    if result['snapshots']:
+        growth = top_growth(result['snapshots'][args.warmup_hours - 1], result['snapshots'][-1])
+
+    if growth:
+        print("Largest allocation growth after the warm-up:")
+        for site in growth:
+            print(f"  {site['site']}: +{site['size_diff_kb']}KB in {site['count_diff']:+d} blocks")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS: memory and latency stayed within bounds.")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key != "output"},
+                'timeline': result['timeline'],
+                'top_growth': growth,
+                'failures': failures,
+            }, f, indent=2)
+        print(f"Results saved to '{args.output}'.")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,140 @@
+import numpy as np
+from scipy.signal import lfilter
+
+import telemetry_schema
+
+# Number of cascaded first-order stages used to approximate a Gaussian response
+GAUSSIAN_STAGES = 4
+
+
+def ema_alpha(span: float) -> float:
+    """Smoothing factor of an EMA whose span (in samples) is `span`, like pandas' ewm(span=...)."""
+    return 2 / (span + 1)
+
+
+def gaussian_stage_alpha(sigma: float, stages: int = GAUSSIAN_STAGES) -> float:
+    """
+    Smoothing factor of each stage of a cascade of identical EMAs approximating a Gaussian of width `sigma`.
+
+    A chain of first-order filters has a gamma-shaped impulse response that approaches a (delayed)
+    Gaussian as stages are added. Each stage with factor a contributes a variance of (1 - a) / a^2
+    samples^2, so the factor is chosen to make the total variance sigma^2.
+    """
+    if sigma <= 0:
+        return 1.0
+    return (-stages + np.sqrt(stages ** 2 + 4 * sigma ** 2 * stages)) / (2 * sigma ** 2)
+
+
+class StreamingFilter:
+    """
+    Causal per-channel smoothing of the live telemetry of the whole field.
+
+    Every channel is configured as a pass-through, an EMA, or a cascade of EMAs approximating the
+    Gaussian smoothing data_script.py applies to the training data. The state is GAUSSIAN_STAGES
+    values per (car, channel), and a tick updates all of them with one array operation per stage.
+    """
+
+    def __init__(self, channels: list, num_cars: int, config: dict):
+        """
+        Args:
+            channels: Telemetry channel names, in the column order of the arrays passed to update()
+            num_cars: Number of cars in the field
+            config: Filter per channel, {'type': 'ema', 'span': 10} or {'type': 'gaussian', 'sigma': 20};
+                    channels that are not configured are passed through unchanged
+        """
+        self.channels = list(channels)
+
+        # Unused stages of a channel have a factor of 1, which passes their input through
+        self._alpha = np.ones((GAUSSIAN_STAGES, len(self.channels)))
+        for i, channel in enumerate(self.channels):
+            settings = config.get(channel)
+            if settings is None:
+                continue
+            if settings['type'] == 'ema':
+                self._alpha[0, i] = ema_alpha(settings['span'])
+            elif settings['type'] == 'gaussian':
+                self._alpha[:, i] = gaussian_stage_alpha(settings['sigma'])
+            else:
+                raise ValueError(f"Unknown filter type '{settings['type']}' for channel '{channel}'")
+
+        self._state = np.zeros((GAUSSIAN_STAGES, num_cars, len(self.channels)))
+        self._initialized = np.zeros(num_cars, dtype=bool)
+
+    def update(self, telemetry: np.ndarray) -> np.ndarray:
+        """
+        Filters one tick of telemetry.
+
+        Args:
+            telemetry: A (cars x channels) array of the current raw values
+
+        Returns:
+            A (cars x channels) array of the filtered values
+        """
+        telemetry = np.asarray(telemetry, dtype=float)
+
+        # Start every car from its first sample instead of ramping up from zero
+        new_cars = ~self._initialized
+        if new_cars.any():
+            self._state[:, new_cars] = telemetry[new_cars]
+            self._initialized[new_cars] = True
+
+        value = telemetry
+        for stage in range(GAUSSIAN_STAGES):
+            self._state[stage] += self._alpha[stage] * (value - self._state[stage])
+            value = self._state[stage]
+        return value.copy()
+
+    def update_series(self, car: int, telemetry: np.ndarray) -> np.ndarray:
+        """
+        Filters consecutive ticks of one car at once, with the same result as calling update() tick by tick.
+
+        Every stage runs over the whole series with one lfilter call per channel, so recorded telemetry,
+        e.g. a training shard, is filtered in chunks without a Python loop over its ticks.
+
+        Args:
+            car: The car the ticks belong to
+            telemetry: A (ticks x channels) array of raw values, oldest first
+
+        Returns:
+            A (ticks x channels) array of the filtered values
+        """
+        telemetry = np.asarray(telemetry, dtype=float)
+        if len(telemetry) == 0:
+            return telemetry.copy()
+
+        if not self._initialized[car]:
+            self._state[:, car] = telemetry[0]
+            self._initialized[car] = True
+
+        value = telemetry
+        for stage in range(GAUSSIAN_STAGES):
+            filtered = np.empty_like(value)
+            for channel, alpha in enumerate(self._alpha[stage]):
+                # state += alpha * (value - state) is the first-order recursion y[n] = alpha * x[n] + (1 - alpha) * y[n - 1]
+                filtered[:, channel], _ = lfilter([alpha], [1, alpha - 1], value[:, channel], zi=[(1 - alpha) * self._state[stage, car, channel]])
+            self._state[stage, car] = filtered[-1]
+            value = filtered
+        return value
+
+    def reset(self, car: int):
+        """Forgets the state of a car, e.g. when its telemetry source changes."""
+        self._initialized[car] = False
+
+
+# Width of the Gaussian smoothing data_script.py applies to the training data (SMOOTHING_SIGMA)
+RISK_MODEL_SIGMA = 20
+
+
+def risk_model_filter(num_cars: int, channels: list = telemetry_schema.CHANNEL_NAMES) -> StreamingFilter:
+    """
+    The causal smoothing the telemetry goes through before the risk model scores it.
+
+    Args:
+        num_cars: Number of cars in the field
+        channels: Telemetry channels in the column order of the filtered arrays, all of them by default
+    """
+    return StreamingFilter(
+        channels,
+        num_cars,
+        {channel: {"type": "gaussian", "sigma": RISK_MODEL_SIGMA} for channel in telemetry_schema.SMOOTHED_CHANNELS},
+    )
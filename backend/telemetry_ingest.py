@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class TelemetryIngest:
+    """
+    Accepts telemetry pushed by real cars in batches and feeds it to the race loop tick by tick.
+
+    Batches are converted to a (rows x channels) array and range checked with NumPy in one go,
+    then handed to a bounded asyncio queue. When the queue is full the batch is refused instead
+    of buffered, so the sender knows to back off. A consumer task drains the queue into a backlog
+    per car, and on every tick the race loop takes all rows a car has sent since the last one, so
+    cars sending at 10-100 Hz are kept up with by a race that ticks once a second. Rows of a car
+    that are queued or in its backlog count against `max_backlog`, and a batch that would exceed
+    it is refused as well, so no accepted row is ever dropped.
+    """
+
+    def __init__(self, channels: list, channel_bounds: dict, num_cars: int, queue_size: int = 64, max_age_seconds: float = 5, max_backlog: int = 1000):
+        """
+        Args:
+            channels: Telemetry channel names, every row has to provide all of them
+            channel_bounds: (min, max) per channel, rows with a value outside are rejected
+            num_cars: Number of cars in the field, cars are addressed by index
+            queue_size: Maximum number of batches waiting to be applied
+            max_age_seconds: How long the latest row of a car is used once its backlog is empty, before falling back to the simulator
+            max_backlog: Rows accepted per car that the race loop has not taken yet, and so the most rows of
+                         a car a single batch may hold
+        """
+        self.channels = list(channels)
+        self.num_cars = num_cars
+        self.max_age_seconds = max_age_seconds
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+        self._lower = np.array([channel_bounds[channel][0] for channel in self.channels], dtype=float)
+        self._upper = np.array([channel_bounds[channel][1] for channel in self.channels], dtype=float)
+
+        self.max_backlog = max_backlog
+        self.backlog = [deque() for _ in range(num_cars)]
+        # Rows per car that are queued or in the backlog; the race loop takes rows from another thread
+        self.pending = np.zeros(num_cars, dtype=np.int64)
+        self._pending_lock = threading.Lock()
+        self.latest = np.full((num_cars, len(self.channels)), np.nan)
+        self.received_at = np.full(num_cars, -np.inf)
+
+    def parse_ndjson(self, body: bytes):
+        """
+        Converts newline-delimited JSON rows ({"car": 0, "engine_rpm": ..., ...}) to arrays.
+
+        Returns:
+            A (cars, values) tuple, values being a (rows x channels) array with NaN for missing channels
+        """
+        rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        cars = self._car_numbers([row.get('car', -1) for row in rows])
+        values = np.empty((len(rows), len(self.channels)))
+        for i, channel in enumerate(self.channels):
+            values[:, i] = np.fromiter((row.get(channel, np.nan) for row in rows), dtype=float, count=len(rows))
+        return cars, values
+
+    def parse_columnar(self, payload: dict):
+        """
+        Converts a columnar batch ({"car": [...], "engine_rpm": [...], ...}) to arrays.
+
+        Returns:
+            A (cars, values) tuple, values being a (rows x channels) array with NaN for missing channels
+        """
+        cars = self._car_numbers(payload.get('car', []))
+        values = np.full((len(cars), len(self.channels)), np.nan)
+        for i, channel in enumerate(self.channels):
+            if channel in payload:
+                values[:, i] = np.asarray(payload[channel], dtype=float)
+        return cars, values
+
+    @staticmethod
+    def _car_numbers(cars: list) -> np.ndarray:
+        """Car numbers as floats; JSON booleans become -1, so validate() rejects their rows instead of taking true as car 1."""
+        return np.array([-1 if isinstance(car, bool) else car for car in cars], dtype=float)
+
+    def validate(self, cars: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Range checks a whole batch at once.
+
+        Returns:
+            A boolean mask of the rows that have a known car and all channels present and within bounds
+        """
+        known_car = (cars >= 0) & (cars < self.num_cars) & (cars == np.floor(cars))
+        # NaN fails both comparisons, so missing channels are rejected as well
+        in_bounds = np.all((values >= self._lower) & (values <= self._upper), axis=1)
+        return known_car & in_bounds
+
+    def submit(self, cars: np.ndarray, values: np.ndarray):
+        """
+        Queues a validated batch without waiting.
+
+        Raises:
+            ValueError: If the batch holds more rows of a car than its backlog can, it can never be accepted
+            asyncio.QueueFull: If the queue or the backlog of a car in the batch is full, the caller should ask the
+                               sender to retry later
+        """
+        cars = cars.astype(np.intp)
+        rows_per_car = np.bincount(cars, minlength=self.num_cars)
+        too_large = np.flatnonzero(rows_per_car > self.max_backlog)
+        if len(too_large):
+            car = int(too_large[0])
+            raise ValueError(f"The batch holds {rows_per_car[car]} rows of car {car}, at most {self.max_backlog} rows per car are accepted")
+        with self._pending_lock:
+            full = np.flatnonzero(self.pending + rows_per_car > self.max_backlog)
+            if len(full):
+                raise asyncio.QueueFull(f"The backlog of car {int(full[0])} is full")
+            self.queue.put_nowait((cars, values))
+            self.pending += rows_per_car
+
+    async def run(self):
+        """Moves queued batches to the backlogs of their cars, in arrival order, until cancelled."""
+        while True:
+            cars, values = await self.queue.get()
+            for car, row in zip(cars.tolist(), values):
+                self.backlog[car].append(row)
+
+    def take_rows(self, car: int):
+        """
+        Takes all rows of a car's backlog, or repeats its last row while that is recent.
+
+        Returns:
+            A (rows x channels) array in arrival order and channel order, a single row when the backlog is empty,
+            or None if the car has sent nothing recently
+        """
+        backlog = self.backlog[car]
+        if backlog:
+            # Only the rows there now, the consumer task may append more while they are taken
+            rows = np.array([backlog.popleft() for _ in range(len(backlog))])
+            self.latest[car] = rows[-1]
+            self.received_at[car] = time.monotonic()
+            with self._pending_lock:
+                self.pending[car] -= len(rows)
+            return rows
+        if time.monotonic() - self.received_at[car] > self.max_age_seconds:
+            return None
+        return self.latest[car][np.newaxis]
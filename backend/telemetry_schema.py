@@ -0,0 +1,98 @@
+"""
+The telemetry channels of a car, in one place.
+
+Every channel is listed once with its group, unit, the (min, max) range the simulator clips it
+to, its storage dtype and whether the risk model sees it smoothed. The order of CHANNELS is the
+column order used everywhere: data points, CSV datasets, telemetry matrices, shared memory and
+checkpoints. Adding a channel here adds it to all of them.
+
+One tick of the field is a record array of TELEMETRY_DTYPE, one record per car. Components that
+work on all channels at once get a (cars x channels) float64 view of it from as_matrix(), which
+does not copy, and dicts are only built where JSON is produced.
+"""
+import numpy as np
+from numpy.lib import recfunctions
+
+# The simulator clips brake disc temperatures relative to its BRAKE_DISC_TEMP_BASE, so the bounds follow
+# the base when it is changed, e.g. by a scenario sweep. The schema bounds are those of the default base.
+BRAKE_DISC_TEMP_BASE = 400
+BRAKE_DISC_TEMP_RANGE = (0.7, 1.8)
+
+CHANNELS = [
+    {'name': 'engine_rpm', 'group': 'car', 'unit': 'rpm', 'bounds': (5000, 9000), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'brake_pedal_pressure', 'group': 'car', 'unit': 'bar', 'bounds': (0, np.inf), 'dtype': 'f8', 'smoothed': False},
+    *[
+        {'name': f'brake_disc_temp_{side}', 'group': 'car', 'unit': '°C', 'bounds': tuple(BRAKE_DISC_TEMP_BASE * factor for factor in BRAKE_DISC_TEMP_RANGE), 'dtype': 'f8', 'smoothed': True}
+        for side in ['FL', 'FR', 'RL', 'RR']
+    ],
+    *[
+        channel
+        for side in ['FL', 'FR', 'RL', 'RR']
+        for channel in [
+            {'name': f'tire_temp_{side}', 'group': 'car', 'unit': '°C', 'bounds': (70, 115), 'dtype': 'f8', 'smoothed': True},
+            {'name': f'tire_pressure_{side}', 'group': 'car', 'unit': 'psi', 'bounds': (28, 32), 'dtype': 'f8', 'smoothed': True},
+        ]
+    ],
+    {'name': 'tire_wear_rate', 'group': 'car', 'unit': 'fraction', 'bounds': (0.0, 1.0), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'coolant_temperature', 'group': 'car', 'unit': '°C', 'bounds': (85, 105), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'coolant_pressure', 'group': 'car', 'unit': 'bar', 'bounds': (1.0, 1.6), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'oil_temperature', 'group': 'car', 'unit': '°C', 'bounds': (90, 115), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'oil_pressure', 'group': 'car', 'unit': 'psi', 'bounds': (40, 75), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'oil_level', 'group': 'car', 'unit': 'fraction', 'bounds': (0.7, 1.0), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'heart_rate', 'group': 'driver', 'unit': 'bpm', 'bounds': (100, 170), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'gsr', 'group': 'driver', 'unit': 'µS', 'bounds': (0, 12), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'pupil_dilation', 'group': 'driver', 'unit': 'mm', 'bounds': (3.0, 6.0), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'blink_rate', 'group': 'driver', 'unit': 'blinks/min', 'bounds': (5, 20), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'track_temperature', 'group': 'environment', 'unit': '°C', 'bounds': (10, 50), 'dtype': 'f8', 'smoothed': True},
+    {'name': 'rainfall_intensity', 'group': 'environment', 'unit': 'mm/h', 'bounds': (0.0, np.inf), 'dtype': 'f8', 'smoothed': False},
+    {'name': 'ambient_light', 'group': 'environment', 'unit': 'lux', 'bounds': (10, np.inf), 'dtype': 'f8', 'smoothed': True},
+]
+
+CHANNEL_NAMES = [channel['name'] for channel in CHANNELS]
+CHANNEL_BOUNDS = {channel['name']: channel['bounds'] for channel in CHANNELS}
+CHANNEL_UNITS = {channel['name']: channel['unit'] for channel in CHANNELS}
+CHANNELS_BY_GROUP = {group: [channel['name'] for channel in CHANNELS if channel['group'] == group] for group in ['car', 'driver', 'environment']}
+# Discrete events and rainfall are not smoothed, like in data_script.py
+SMOOTHED_CHANNELS = [channel['name'] for channel in CHANNELS if channel['smoothed']]
+
+TELEMETRY_DTYPE = np.dtype([(channel['name'], channel['dtype']) for channel in CHANNELS])
+_ALL_FLOAT64 = all(TELEMETRY_DTYPE[name] == np.float64 for name in CHANNEL_NAMES)
+
+
+def empty_records(num_rows: int) -> np.ndarray:
+    """A record array of `num_rows` telemetry rows, NaN until written."""
+    return np.full(num_rows, np.nan, dtype=TELEMETRY_DTYPE)
+
+
+def as_matrix(records: np.ndarray) -> np.ndarray:
+    """
+    The records as a (rows x channels) float64 array.
+
+    While every channel is stored as float64 this is a view of the same memory, so writing to
+    the matrix writes the records; a channel with another dtype makes it a converted copy.
+    """
+    if _ALL_FLOAT64:
+        return records.view(np.float64).reshape(len(records), len(CHANNELS))
+    return recfunctions.structured_to_unstructured(records, dtype=np.float64)
+
+
+def to_dicts(records: np.ndarray) -> list:
+    """The records as data point dicts, for JSON responses."""
+    return [dict(zip(CHANNEL_NAMES, row)) for row in as_matrix(records).tolist()]
+
+
+def to_dict() -> dict:
+    """The schema as served to clients: name, group, unit and bounds of every channel, in column order."""
+    return {
+        'channels': [
+            {
+                'name': channel['name'],
+                'group': channel['group'],
+                'unit': channel['unit'],
+                # JSON has no infinity, an open side is null
+                'min': float(channel['bounds'][0]) if np.isfinite(channel['bounds'][0]) else None,
+                'max': float(channel['bounds'][1]) if np.isfinite(channel['bounds'][1]) else None,
+            }
+            for channel in CHANNELS
+        ],
+    }
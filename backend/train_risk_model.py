@@ -0,0 +1,210 @@
+"""
+Trains the crash-risk anomaly model out of core over datasets written by generate_datasets.py.
+
+The shards are streamed in chunks and reduced to sufficient statistics (row count, mean vector
+and scatter matrix), merged chunk by chunk, so training time grows linearly with the data and
+memory is bounded by the chunk size. Every shard is one car, and its raw telemetry goes through
+the same causal smoothing main.py applies before scoring. The smoothed feature columns of every
+shard are cached on disk as .npy files keyed by the shard digest and the smoothing, so training
+again skips parsing the CSV files.
+
+The result is checked against simulated telemetry of a whole race, like main.py does at startup,
+and written as a versioned artifact that main.py loads at startup.
+
+Usage:
+    python train_risk_model.py datasets/manifest.json --output model/risk_model.npz
+    python train_risk_model.py --simulate-reference model/train_data.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import race_data_simulator
+import telemetry_schema
+from model.anomaly_detection import MultivariateAnomalyDetection, check_calibration
+from telemetry_filter import GAUSSIAN_STAGES, RISK_MODEL_SIGMA, risk_model_filter
+
+DEFAULT_COLUMNS = ['engine_rpm', 'coolant_temperature', 'oil_temperature', 'oil_pressure', 'heart_rate', 'gsr', 'pupil_dilation', 'blink_rate']
+DEFAULT_ARTIFACT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "risk_model.npz")
+DEFAULT_TRAIN_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "train_data.csv")
+
+
+class SufficientStatistics:
+    """Row count, mean vector and scatter matrix of the data seen so far, merged chunk by chunk."""
+
+    def __init__(self, num_columns: int):
+        self.count = 0
+        self.mean = np.zeros(num_columns)
+        self.scatter = np.zeros((num_columns, num_columns))
+
+    def update(self, chunk: np.ndarray):
+        """Merges the statistics of a (rows x columns) chunk, using the pairwise update of Chan et al."""
+        if len(chunk) == 0:
+            return
+
+        chunk_count = len(chunk)
+        chunk_mean = chunk.mean(axis=0)
+        centered = chunk - chunk_mean
+        chunk_scatter = centered.T @ centered
+
+        total = self.count + chunk_count
+        delta = chunk_mean - self.mean
+        self.scatter += chunk_scatter + np.outer(delta, delta) * (self.count * chunk_count / total)
+        self.mean += delta * (chunk_count / total)
+        self.count = total
+
+
+def features_key(columns: list) -> str:
+    """Identifies the feature columns and the smoothing they go through, changing either changes the key."""
+    smoothing = [column for column in columns if column in telemetry_schema.SMOOTHED_CHANNELS]
+    return f"{','.join(columns)};gaussian:{RISK_MODEL_SIGMA}x{GAUSSIAN_STAGES}:{','.join(smoothing)}"
+
+
+def feature_chunks(shard: dict, dataset_dir: str, columns: list, cache_dir: str, chunk_size: int):
+    """
+    Yields the smoothed feature columns of a shard in (rows x columns) chunks.
+
+    The first pass parses the CSV file, runs the rows through the risk model smoothing and writes the
+    features to a memory-mapped .npy cache file while yielding them; later passes read the cache instead.
+    """
+    columns_key = hashlib.sha256(features_key(columns).encode()).hexdigest()[:8]
+    cache_file = os.path.join(cache_dir, f"{shard['sha256'][:16]}_{columns_key}.npy")
+
+    if os.path.exists(cache_file):
+        features = np.load(cache_file, mmap_mode='r')
+        for start in range(0, len(features), chunk_size):
+            yield np.asarray(features[start:start + chunk_size], dtype=float)
+        return
+
+    partial_file = cache_file + ".partial"
+    features = np.lib.format.open_memmap(partial_file, mode='w+', dtype=np.float64, shape=(shard['rows'], len(columns)))
+    # The shard is a single car, its smoothing state carries over from chunk to chunk
+    smoothing = risk_model_filter(1, columns)
+    start = 0
+    for chunk in pd.read_csv(os.path.join(dataset_dir, shard['file']), usecols=columns, chunksize=chunk_size):
+        values = smoothing.update_series(0, chunk[columns].to_numpy(dtype=float))
+        features[start:start + len(values)] = values
+        start += len(values)
+        yield values
+    features.flush()
+    del features
+    # Only a completely written cache file is picked up by later runs
+    os.replace(partial_file, cache_file)
+
+
+def simulate_reference(columns: list, cars: int = 4, ticks: int = 86400, sample_every: int = 16, seed: int | list = 0,
+                       start_seconds: int = 0, warmup: int = 0) -> pd.DataFrame:
+    """
+    Simulates telemetry shaped like what the live race scores.
+
+    Every car is a RaceDataSimulator with the defaults main.py uses, and the telemetry goes through
+    the same causal smoothing as in main.py before the risk model sees it. The default covers a whole
+    24 hour race, so the day/night cycle of the light-driven channels is in the data.
+
+    Args:
+        columns: Telemetry channels to keep
+        cars: Number of cars simulated side by side
+        ticks: Number of ticks simulated per car after the warmup
+        sample_every: Keep every n-th tick, neighbouring smoothed ticks are nearly identical
+        seed: Root seed or SeedSequence entropy, every car gets its own spawned stream
+        start_seconds: Race time the simulators start at, see RaceDataSimulator.start_at()
+        warmup: Number of ticks simulated and dropped first, so the channels settle after a late start
+
+    Returns:
+        A DataFrame with one row per kept tick and car
+    """
+    simulators = [race_data_simulator.RaceDataSimulator(random_seed=seed_seq) for seed_seq in np.random.SeedSequence(seed).spawn(cars)]
+    for simulator in simulators:
+        simulator.start_at(start_seconds)
+    smoothing = risk_model_filter(cars)
+    column_index = [telemetry_schema.CHANNEL_NAMES.index(column) for column in columns]
+
+    records = telemetry_schema.empty_records(cars)
+    kept = []
+    for tick in range(-warmup, ticks):
+        for car, simulator in enumerate(simulators):
+            simulator.generate_next_record(records, car)
+        smoothed = smoothing.update(telemetry_schema.as_matrix(records))
+        if tick >= 0 and tick % sample_every == sample_every - 1:
+            kept.append(smoothed[:, column_index])
+    return pd.DataFrame(np.concatenate(kept), columns=columns)
+
+
+def race_calibration_sample(columns: list, race_hours: int = 24, ticks_per_hour: int = 300, warmup: int = 300, seed: int = 0) -> np.ndarray:
+    """
+    A short window of simulated reference telemetry from every hour of the race.
+
+    Much cheaper than simulating the whole race, but it still sees the night and day values of the
+    light-driven channels and the late-race values of the slowly drifting ones.
+
+    Returns:
+        A (race_hours * ticks_per_hour x columns) array, hour by hour, in the order of columns
+    """
+    return np.concatenate([
+        simulate_reference(columns, cars=1, ticks=ticks_per_hour, sample_every=1, seed=[seed, hour], start_seconds=hour * 3600, warmup=warmup).to_numpy()
+        for hour in range(race_hours)
+    ])
+
+
+def train(manifest_files: list, columns: list, cache_dir: str | None, chunk_size: int) -> MultivariateAnomalyDetection:
+    """
+    Accumulates the sufficient statistics over all shards of the given dataset manifests.
+
+    Returns:
+        The trained detector, versioned by the shards and columns it was trained on
+    """
+    statistics = SufficientStatistics(len(columns))
+    version = hashlib.sha256(features_key(columns).encode())
+
+    for manifest_file in manifest_files:
+        dataset_dir = os.path.dirname(os.path.abspath(manifest_file))
+        shard_cache_dir = cache_dir or os.path.join(dataset_dir, "feature_cache")
+        os.makedirs(shard_cache_dir, exist_ok=True)
+
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+        for shard in manifest['shards']:
+            version.update(shard['sha256'].encode())
+            for chunk in feature_chunks(shard, dataset_dir, columns, shard_cache_dir, chunk_size):
+                statistics.update(chunk)
+        print(f"Read {len(manifest['shards'])} shards from '{manifest_file}', {statistics.count} rows so far.")
+
+    return MultivariateAnomalyDetection.from_statistics(columns, statistics.count, statistics.mean, statistics.scatter, version.hexdigest()[:12])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the crash-risk anomaly model over generated datasets.")
+    parser.add_argument("manifests", nargs="*", help="Dataset manifest files written by generate_datasets.py")
+    parser.add_argument("--simulate-reference", nargs="?", const=DEFAULT_TRAIN_DATA_FILE, metavar="CSV",
+                        help="Instead of training, write simulated and smoothed reference data to CSV (default: the bundled train_data.csv)")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_FILE, help="Path of the model artifact to write")
+    parser.add_argument("--columns", nargs="+", default=DEFAULT_COLUMNS, help="Telemetry channels to train on")
+    parser.add_argument("--cache-dir", default=None, help="Feature cache directory, defaults to feature_cache/ next to each manifest")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows read per chunk, bounds the memory used")
+    args = parser.parse_args()
+
+    if args.simulate_reference:
+        reference = simulate_reference(args.columns)
+        reference.to_csv(args.simulate_reference, index=False)
+        print(f"{len(reference)} simulated reference rows saved to '{args.simulate_reference}'.")
+        return
+    if not args.manifests:
+        parser.error("at least one manifest is required unless --simulate-reference is given")
+
+    detector = train(args.manifests, args.columns, args.cache_dir, args.chunk_size)
+    # main.py refuses a model that does not fit the live telemetry, so it is not written in the first place
+    try:
+        check_calibration(detector, race_calibration_sample(args.columns, race_hours=24), segments=24)
+    except ValueError as e:
+        parser.exit(1, f"Model {detector.model_version} not saved: {e}\n")
+    detector.save(args.output)
+    print(f"Model {detector.model_version} trained on {detector.count} rows saved to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
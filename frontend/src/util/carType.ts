@@ -1,3 +1,56 @@
+// Telemetry channels in the column order of backend/telemetry_schema.py, which /schema serves.
+// Typed here so that a misspelt channel fails to compile; update it when a channel is added there
+export const TELEMETRY_CHANNELS = [
+    "engine_rpm",
+    "brake_pedal_pressure",
+    "brake_disc_temp_FL",
+    "brake_disc_temp_FR",
+    "brake_disc_temp_RL",
+    "brake_disc_temp_RR",
+    "tire_temp_FL",
+    "tire_pressure_FL",
+    "tire_temp_FR",
+    "tire_pressure_FR",
+    "tire_temp_RL",
+    "tire_pressure_RL",
+    "tire_temp_RR",
+    "tire_pressure_RR",
+    "tire_wear_rate",
+    "coolant_temperature",
+    "coolant_pressure",
+    "oil_temperature",
+    "oil_pressure",
+    "oil_level",
+    "heart_rate",
+    "gsr",
+    "pupil_dilation",
+    "blink_rate",
+    "track_temperature",
+    "rainfall_intensity",
+    "ambient_light",
+] as const;
+
+export type TelemetryChannel = (typeof TELEMETRY_CHANNELS)[number];
+
+// One channel of the /schema response, an open side of the range is null
+export interface TelemetryChannelSchema {
+    name: TelemetryChannel;
+    group: "car" | "driver" | "environment";
+    unit: string;
+    min: number | null;
+    max: number | null;
+  }
+
+// The nearest cars on track, by index into the /stats rows
+export interface CarProximity {
+    ahead_car: number;
+    ahead_distance: number;
+    ahead_interval: number;
+    behind_car: number;
+    behind_distance: number;
+    behind_interval: number;
+  }
+
 export interface Car {
     driver_data: {
       Pic: number;
@@ -14,34 +67,12 @@ export interface Car {
       pit_time_remaining: number;
       next_pit_in: number;
     };
-    data: {
-      engine_rpm: number;
-      brake_pedal_pressure: number;
-      brake_disc_temp_FL: number;
-      brake_disc_temp_FR: number;
-      brake_disc_temp_RL: number;
-      brake_disc_temp_RR: number;
-      tire_temp_FL: number;
-      tire_pressure_FL: number;
-      tire_temp_FR: number;
-      tire_pressure_FR: number;
-      tire_temp_RL: number;
-      tire_pressure_RL: number;
-      tire_temp_RR: number;
-      tire_pressure_RR: number;
-      tire_wear_rate: number;
-      coolant_temperature: number;
-      coolant_pressure: number;
-      oil_temperature: number;
-      oil_pressure: number;
-      oil_level: number;
-      heart_rate: number;
-      gsr: number;
-      pupil_dilation: number;
-      blink_rate: number;
-      track_temperature: number;
-      rainfall_intensity: number;
-      ambient_light: number;
-    };
+    // Keyed by the channels of the telemetry schema
+    data: Record<TelemetryChannel, number>;
+    // Null while the car is not on track, e.g. in the pits
+    proximity: CarProximity | null;
+    anomaly: number;
     risk: number;
+    // Index into the /palette colors
+    risk_color: number;
   }